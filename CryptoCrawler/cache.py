@@ -0,0 +1,72 @@
+import json
+import sqlite3
+import time
+from multidict import CIMultiDict
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    url TEXT PRIMARY KEY,
+    status INTEGER NOT NULL,
+    headers TEXT NOT NULL,
+    body BLOB NOT NULL,
+    stored REAL NOT NULL,
+    used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_used ON responses (used);
+"""
+
+class ResponseCache():
+    """
+        Successful responses kept on disk in one SQLite file, keyed by URL.
+        Entries older than ttl seconds are treated as missing and the least
+        recently used ones are evicted once the bodies pass max_bytes. In
+        replay mode entries never expire and fetch_page serves misses as
+        errors instead of going to the network, so recorded pages can be
+        parsed again offline and deterministically.
+    """
+
+    def __init__(self, path="http_cache.db", ttl=300.0, max_bytes=64 * 2 ** 20, replay=False):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.replay = replay
+        self.hits = self.misses = 0
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def get(self, url):
+        "Returns (status, text, headers) for a fresh entry, otherwise None"
+        record = self.db.execute("SELECT status, headers, body, stored FROM responses WHERE url = ?", (url,)).fetchone()
+        now = time.time()
+        if record is None or (not self.replay and now - record[3] > self.ttl):
+            self.misses += 1
+            return None
+        with self.db:
+            self.db.execute("UPDATE responses SET used = ? WHERE url = ?", (now, url))
+        self.hits += 1
+        return record[0], record[2].decode("utf-8"), CIMultiDict((k, v) for k, v in json.loads(record[1]))
+
+    def put(self, url, status, text, headers):
+        body = text.encode("utf-8")
+        now = time.time()
+        with self.db:
+            self.db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                            (url, status, json.dumps(list(headers.items())), body, now, now))
+            self._evict()
+
+    def _evict(self):
+        total = self.db.execute("SELECT coalesce(sum(length(body)), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for url, size in self.db.execute("SELECT url, length(body) FROM responses ORDER BY used").fetchall():
+            self.db.execute("DELETE FROM responses WHERE url = ?", (url,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self):
+        with self.db:
+            self.db.execute("DELETE FROM responses")
@@ -0,0 +1,118 @@
+import argparse
+import sys
+from collections import namedtuple
+
+# aiohttp, the response cache and pandas are imported inside the functions
+# that need them, so importing this module is cheap and a fetch-to-CSV run
+# never loads pandas or openpyxl
+
+Snapshot = namedtuple("Snapshot", ["time", "rows"])
+
+# where --replay and replay=True read recorded pages when no cache file is named
+REPLAY_CACHE = "http_cache.db"
+
+def _cache(path, ttl, replay):
+    if path is None and replay:
+        path = REPLAY_CACHE
+    if path is None:
+        return None
+    from cache import ResponseCache
+    return ResponseCache(path, ttl=ttl, replay=replay)
+
+def _crawl(top, on_page, url, page_url, cache):
+    import asyncio
+    from listing import crawl
+    kwargs = {"url": url} if url is not None else {}
+    try:
+        return asyncio.run(crawl(top, on_page, page_url=page_url, cache=cache, **kwargs))
+    finally:
+        if cache is not None:
+            cache.close()
+
+def fetch_snapshot(top=30, url=None, page_url=None, cache=None, ttl=300.0, replay=False):
+    """
+        Downloads the top coins of the listing and returns Snapshot(time, rows),
+        time being the page's 'YYYY-MM-DD HH:MM:SS' Beijing time. url defaults
+        to fetch.URL and page_url works as in listing.iter_listing. cache names
+        an on-disk response cache file to read through, see cache.py. With
+        replay the pages come from that cache (REPLAY_CACHE by default) and
+        never from the network.
+    """
+    stamps, rows = [], []
+
+    def on_page(stamp, page_rows):
+        stamps.append(stamp)
+        rows.extend(page_rows)
+
+    _crawl(top, on_page, url, page_url, _cache(cache, ttl, replay))
+    return Snapshot(stamps[0] if stamps else None, rows)
+
+def save_snapshot(snapshot, path):
+    """
+        Stores a snapshot by path's extension: appends it to a SQLite snapshot
+        store (.db) or a CSV file (anything else), or writes an Excel file (.xlsx)
+    """
+    _writer(path)(snapshot.time, snapshot.rows)
+
+def _writer(path):
+    "A function (stamp, rows) appending to path, and for .xlsx collecting rows until the file is written"
+    if path.endswith(".db"):
+        from store import SnapshotStore
+
+        def write(stamp, rows):
+            with SnapshotStore(path) as store:
+                store.append(stamp, rows)
+    elif path.endswith(".xlsx"):
+        from store import write_excel
+
+        def write(stamp, rows):
+            write_excel(path, [[stamp, *row] for row in rows])
+    else:
+        from store import append_csv
+
+        def write(stamp, rows):
+            append_csv(path, stamp, rows)
+    return write
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record the top coins of the listing")
+    parser.add_argument("--top", type=int, default=30, help="how many coins to record")
+    parser.add_argument("--url", help="first listing page, fetch.URL by default")
+    parser.add_argument("--page-url", help="URL template for numbered pages, e.g. 'https://.../coin/?page={}'")
+    parser.add_argument("--output", nargs="+", default=["coins.csv"],
+                        help="files to write: .db snapshot store, .xlsx spreadsheet or CSV")
+    parser.add_argument("--cache", help="on-disk response cache file, e.g. http_cache.db")
+    parser.add_argument("--ttl", type=float, default=300.0, help="seconds a cached response stays fresh")
+    parser.add_argument("--replay", action="store_true",
+                        help="serve pages from the cache (default http_cache.db) only, never the network")
+    parser.add_argument("--metrics-log", help="append per-stage JSON lines to this file, - for stderr")
+    parser.add_argument("--metrics-file", help="write Prometheus-style stage totals to this text file")
+    args = parser.parse_args(argv)
+    if args.metrics_log or args.metrics_file:
+        from metrics import configure
+        configure(args.metrics_log)
+
+    # store and CSV outputs are appended page by page; a spreadsheet is written once at the end
+    streamed = [_writer(path) for path in args.output if not path.endswith(".xlsx")]
+    sheets = [path for path in args.output if path.endswith(".xlsx")]
+    # every page is stamped with the first page's time, so they form one snapshot
+    stamps, kept = [], []
+
+    def on_page(stamp, rows):
+        stamps.append(stamp)
+        if sheets:
+            kept.extend(rows)
+        for write in streamed:
+            write(stamps[0], rows)
+
+    count = _crawl(args.top, on_page, args.url, args.page_url, _cache(args.cache, args.ttl, args.replay))
+    for path in sheets:
+        save_snapshot(Snapshot(stamps[0] if stamps else None, kept), path)
+    print(str(count) + " rows saved to " + ", ".join(args.output))
+    if args.metrics_file:
+        from metrics import METRICS
+        METRICS.write_textfile(args.metrics_file)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
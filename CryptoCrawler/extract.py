@@ -0,0 +1,136 @@
+import re
+from collections import namedtuple
+from html.parser import HTMLParser
+
+Row = namedtuple("Row", ["coin", "symbol", "price", "diff", "volume"])
+
+# table cell class -> field it holds; col4 cells also carry a colour class
+COLUMNS = {"col1": "coin", "col2": "price", "col4": "diff", "col7": "volume"}
+
+# elements without an end tag, which must not be pushed on the open element stack
+VOID = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+# unit suffixes the site uses for large amounts
+UNITS = {"亿": 1e8, "万": 1e4, "K": 1e3, "M": 1e6, "B": 1e9}
+
+def parse_clock(text):
+    "更新时间：2023/04/23 12:30:00 -> '2023-04-23 12:30:00', or None when there is no date"
+    match = re.search(r"(\d{4})[/-](\d{1,2})[/-](\d{1,2})\D+(\d{1,2}):(\d{2})(?::(\d{2}))?", text or "")
+    if match is None:
+        return None
+    y, mo, d, h, mi, s = match.groups()
+    return "%s-%02d-%02d %02d:%s:%s" % (y, int(mo), int(d), int(h), mi, s or "00")
+
+def parse_number(text):
+    "12,345.6 / $1.2亿 / -3.4% -> float, or None for placeholders like --"
+    text = text.strip().replace(",", "").lstrip("$¥").rstrip("%").strip()
+    scale = 1.0
+    if text[-1:] in UNITS:
+        scale = UNITS[text[-1]]
+        text = text[:-1]
+    try:
+        return float(text) * scale
+    except ValueError:
+        return None
+
+class Extractor(HTMLParser):
+    """
+        Pulls coin rows out of the listing markup in a single pass. feed() takes
+        the page in chunks of any size and returns the rows completed so far,
+        so only the open element stack and the current row are held, never the
+        document. The page's MarketClock text ends up in clock and the link
+        to the following page of the listing, if any, in next_page.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.clock = None
+        self.next_page = None
+        self.stack = []
+        self.text = {}
+        self.row = {}
+        self.done = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID:
+            return
+        attrs = dict(attrs)
+        classes = (attrs.get("class") or "").split()
+        field = None
+        if tag == "a" and attrs.get("href") and ("next" in (attrs.get("rel") or "").split() or "next" in classes
+                                                 or any(f == "next" for _, f in self.stack)):
+            self.next_page = attrs["href"]
+        if "next" in classes:
+            field = "next"
+        elif attrs.get("id") == "MarketClock":
+            field = "clock"
+        elif "table-col" in classes:
+            field = next((COLUMNS[c] for c in classes if c in COLUMNS), None)
+            if field == "coin":
+                self._end_row()
+        elif "name" in classes or "sub" in classes:
+            if any(f == "coin" for _, f in self.stack):
+                field = "name" if "name" in classes else "symbol"
+        self.stack.append((tag, field))
+        if field:
+            self.text[field] = []
+
+    def handle_endtag(self, tag):
+        if not any(t == tag for t, _ in self.stack):
+            return
+        while self.stack:
+            t, field = self.stack.pop()
+            if field:
+                self._end_field(field)
+            if t == tag:
+                break
+
+    def handle_data(self, data):
+        for _, field in reversed(self.stack):
+            if field:
+                self.text[field].append(data)
+                return
+
+    def _end_field(self, field):
+        text = "".join(self.text.pop(field)).strip()
+        if field == "clock":
+            self.clock = text
+        elif field in ("name", "symbol"):
+            self.row[field] = text
+        elif field in ("price", "diff", "volume"):
+            self.row[field] = parse_number(text)
+
+    def _end_row(self):
+        row, self.row = self.row, {}
+        # the header row has no name / sub spans and is skipped here
+        if "name" in row and row.get("price") is not None:
+            self.done.append(Row(row["name"], row.get("symbol", ""), row["price"], row.get("diff"), row.get("volume")))
+
+    def feed(self, data):
+        super().feed(data)
+        done, self.done = self.done, []
+        return done
+
+    def close(self):
+        super().close()
+        while self.stack:
+            self.handle_endtag(self.stack[-1][0])
+        self._end_row()
+        done, self.done = self.done, []
+        return done
+
+def iter_rows(chunks, extractor=None):
+    "Yields Rows while the chunks of a page stream in"
+    extractor = extractor or Extractor()
+    for chunk in chunks:
+        yield from extractor.feed(chunk)
+    yield from extractor.close()
+
+def extract_page(text, chunk_size=1 << 16):
+    "Returns (MarketClock text, rows) for a whole page, fed to the extractor in chunks"
+    extractor = Extractor()
+    rows = []
+    for i in range(0, len(text), chunk_size):
+        rows.extend(extractor.feed(text[i:i + chunk_size]))
+    rows.extend(extractor.close())
+    return extractor.clock, rows
@@ -0,0 +1,68 @@
+import asyncio
+import random
+from collections import namedtuple
+import aiohttp
+from metrics import METRICS
+
+URL = "https://price.btcfans.com/coin/"
+
+# statuses worth another try: rate limiting and server-side failures
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+Page = namedtuple("Page", ["url", "status", "text", "headers"])
+
+class FetchError(Exception):
+    "A page could not be fetched within the allowed retries"
+
+async def fetch_page(session, url, semaphore, retries=3, backoff=0.5, headers=None, cache=None):
+    """
+        GETs url through session, holding one of the semaphore's slots while the
+        request is in flight. Connection errors, timeouts and RETRY_STATUSES are
+        retried up to retries times, waiting backoff * 2^attempt seconds (plus
+        jitter) in between. Returns a Page; raises FetchError when out of tries.
+        With a ResponseCache, fresh entries are served from disk and 200
+        responses stored; a cache in replay mode never touches the network.
+    """
+    if cache is not None:
+        with METRICS.stage("cache") as stage:
+            hit = cache.get(url)
+            stage.bytes = len(hit[1]) if hit is not None else 0
+        if hit is not None:
+            return Page(url, *hit)
+        if cache.replay:
+            raise FetchError("Could not fetch " + url + ": not recorded in " + cache.path + " (replay mode)")
+    for attempt in range(retries + 1):
+        try:
+            async with semaphore:
+                with METRICS.stage("fetch") as stage:
+                    async with session.get(url, headers=headers) as response:
+                        body = await response.read()
+                        stage.bytes = len(body)
+                if response.status not in RETRY_STATUSES:
+                    page = Page(url, response.status, body.decode(response.get_encoding(), "replace"),
+                                response.headers.copy())
+                    if cache is not None and page.status == 200:
+                        cache.put(url, page.status, page.text, page.headers)
+                    return page
+                error = "HTTP " + str(response.status)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            error = repr(e)
+        if attempt < retries:
+            await asyncio.sleep(backoff * 2 ** attempt * (1 + random.random() / 2))
+    raise FetchError("Could not fetch " + url + " after " + str(retries + 1) + " tries: " + error)
+
+async def fetch_all(urls, concurrency=8, timeout=10.0, retries=3, backoff=0.5, headers=None, cache=None):
+    """
+        Fetches every url concurrently over one pooled session, so keep-alive
+        connections are reused across pages. At most concurrency requests are
+        in flight at once and each one gets timeout seconds in total. Returns
+        the Pages in the order of urls. cache is an optional ResponseCache.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        return await asyncio.gather(*[fetch_page(session, url, semaphore, retries, backoff, headers, cache) for url in urls])
+
+def fetch_pages(urls, **kwargs):
+    "Blocking wrapper around fetch_all for scripts; takes the same keyword arguments"
+    return asyncio.run(fetch_all(urls, **kwargs))
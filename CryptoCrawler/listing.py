@@ -0,0 +1,59 @@
+import asyncio
+import time
+from urllib.parse import urljoin
+import aiohttp
+from extract import Extractor, parse_clock
+from fetch import URL, FetchError, fetch_page
+from metrics import METRICS
+
+def _parse(page):
+    with METRICS.stage("parse") as stage:
+        extractor = Extractor()
+        rows = extractor.feed(page.text) + extractor.close()
+        stage.bytes, stage.rows = len(page.text), len(rows)
+    next_page = urljoin(page.url, extractor.next_page) if extractor.next_page else None
+    return extractor.clock, rows, next_page
+
+async def iter_listing(top=30, url=URL, page_url=None, concurrency=4, timeout=10.0, retries=3, cache=None):
+    """
+        Yields (MarketClock text, rows) one listing page at a time until top
+        rows have been seen or the listing ends. Without page_url the crawl
+        follows each page's next link; with a template such as
+        "https://example.com/coin/?page={}" it fetches pages 1, 2, ...
+        concurrency at a time. Only the pages of one step are held in memory.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        seen, number, visited = 0, 1, set()
+        while seen < top:
+            if page_url is None:
+                if url is None or url in visited:
+                    return
+                visited.add(url)
+                urls = [url]
+            else:
+                urls = [page_url.format(number + i) for i in range(concurrency)]
+                number += concurrency
+            pages = await asyncio.gather(*[fetch_page(session, u, semaphore, retries, cache=cache) for u in urls])
+            for page in pages:
+                if page.status == 404:
+                    return
+                if page.status != 200:
+                    raise FetchError("Could not fetch " + page.url + ": HTTP " + str(page.status))
+                clock, rows, url = _parse(page)
+                if not rows:
+                    return
+                rows = rows[:top - seen]
+                seen += len(rows)
+                yield clock, rows
+                if seen >= top:
+                    return
+
+async def crawl(top, on_page, **kwargs):
+    "Calls on_page(stamp, rows) for every page iter_listing yields and returns the number of rows"
+    count = 0
+    async for clock, rows in iter_listing(top, **kwargs):
+        on_page(parse_clock(clock) or time.strftime("%Y-%m-%d %H:%M:%S"), rows)
+        count += len(rows)
+    return count
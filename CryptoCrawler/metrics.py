@@ -0,0 +1,90 @@
+import json
+import os
+import sys
+import time
+
+class Stage():
+    "One timed run of a pipeline stage; the code inside the with block fills in bytes and rows"
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+        self.bytes = 0
+        self.rows = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.record(self.name, time.perf_counter() - self.start, self.bytes, self.rows)
+
+class NullStage():
+    "What a disabled Metrics hands out: entering, exiting and setting counts do nothing"
+
+    bytes = rows = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+NULL_STAGE = NullStage()
+
+class Metrics():
+    """
+        Per-stage totals for the crawl pipeline: calls, seconds, bytes and rows
+        of fetch, cache, parse, store, csv and excel. While disabled, stage()
+        returns a shared no-op object, so instrumented code pays one attribute
+        check. With log set, every finished stage is also written to it as one
+        JSON line.
+    """
+
+    def __init__(self, enabled=False, log=None):
+        self.enabled = enabled
+        self.log = log
+        self.totals = {}
+
+    def stage(self, name):
+        return Stage(self, name) if self.enabled else NULL_STAGE
+
+    def record(self, name, seconds, bytes=0, rows=0):
+        total = self.totals.setdefault(name, [0, 0.0, 0, 0])
+        total[0] += 1
+        total[1] += seconds
+        total[2] += bytes
+        total[3] += rows
+        if self.log is not None:
+            self.log.write(json.dumps({"time": round(time.time(), 3), "stage": name, "seconds": round(seconds, 6),
+                                       "bytes": bytes, "rows": rows}) + "\n")
+            self.log.flush()
+
+    def text(self, prefix="crawler"):
+        "The totals in the Prometheus text exposition format"
+        lines = []
+        for i, (metric, kind) in enumerate([("calls", "counter"), ("seconds", "counter"),
+                                            ("bytes", "counter"), ("rows", "counter")]):
+            name = prefix + "_stage_" + metric + "_total"
+            lines.append("# TYPE " + name + " " + kind)
+            for stage, total in sorted(self.totals.items()):
+                lines.append(name + '{stage="' + stage + '"} ' + repr(total[i]))
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        "Replaces path with text() in one rename, so a scraper never reads half a file"
+        with open(path + ".tmp", "w") as f:
+            f.write(self.text())
+        os.replace(path + ".tmp", path)
+
+# the instance every module reports to; front ends turn it on with configure()
+METRICS = Metrics()
+
+def configure(log_path=None, enabled=True):
+    "Enables METRICS, logging JSON lines to log_path ('-' for stderr) when given"
+    METRICS.enabled = enabled
+    if log_path == "-":
+        METRICS.log = sys.stderr
+    elif log_path is not None:
+        METRICS.log = open(log_path, "a")
+    return METRICS
@@ -0,0 +1,129 @@
+import argparse
+import asyncio
+import hashlib
+import sys
+import time
+import aiohttp
+from extract import extract_page, parse_clock
+from fetch import URL, FetchError, fetch_page
+from metrics import METRICS, configure
+from store import SnapshotStore, append_csv, removed
+
+class Poller():
+    """
+        Polls one listing page and reports only what changed. Requests carry
+        the page's last ETag / Last-Modified, so an unchanged page comes back
+        as an empty 304; servers that ignore those headers are caught by a
+        digest of the body instead. Either way the page is not parsed again.
+        Rows are compared with the last snapshot by coin and symbol, and a
+        coin that drops out of the listing is reported as a tombstone row.
+    """
+
+    def __init__(self, url=URL):
+        self.url = url
+        self.etag = None
+        self.modified = None
+        self.digest = None
+        self.previous = {}
+
+    def headers(self):
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.modified:
+            headers["If-Modified-Since"] = self.modified
+        return headers
+
+    def changes(self, rows):
+        """
+            The rows that differ from the previous snapshot, which rows then
+            replaces, plus a store.removed tombstone for every coin that is gone
+        """
+        current = {(row.coin, row.symbol): row for row in rows}
+        changed = [row for key, row in current.items() if self.previous.get(key) != row]
+        changed += [removed(*key) for key in self.previous if key not in current]
+        self.previous = current
+        return changed
+
+    async def poll(self, session, semaphore, **kwargs):
+        """
+            Fetches the page once. Returns None when it has not changed,
+            otherwise (MarketClock text, changed rows). Raises FetchError for
+            any status other than 200 and 304.
+        """
+        page = await fetch_page(session, self.url, semaphore, headers=self.headers(), **kwargs)
+        if page.status == 304:
+            return None
+        if page.status != 200:
+            # an error page must not replace the validators, digest or last snapshot
+            raise FetchError("Could not fetch " + self.url + ": HTTP " + str(page.status))
+        self.etag = page.headers.get("ETag", self.etag)
+        self.modified = page.headers.get("Last-Modified", self.modified)
+        digest = hashlib.sha1(page.text.encode()).digest()
+        if digest == self.digest:
+            return None
+        self.digest = digest
+        with METRICS.stage("parse") as stage:
+            clock, rows = extract_page(page.text)
+            stage.bytes, stage.rows = len(page.text), len(rows)
+        return clock, self.changes(rows)
+
+async def run(poller, interval, on_change, count=None, timeout=10.0, retries=3, metrics_file=None):
+    """
+        Polls every interval seconds, count times or forever, over one
+        keep-alive session, and calls on_change(stamp, rows) whenever some rows
+        changed. Failed polls are reported on stderr and retried next interval.
+        metrics_file is rewritten with the stage totals after every poll.
+    """
+    semaphore = asyncio.Semaphore(1)
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        polls = 0
+        while count is None or polls < count:
+            started = time.monotonic()
+            try:
+                result = await poller.poll(session, semaphore, retries=retries)
+            except FetchError as e:
+                print(e, file=sys.stderr)
+                result = None
+            if result is not None and result[1]:
+                clock, rows = result
+                on_change(parse_clock(clock) or time.strftime("%Y-%m-%d %H:%M:%S"), rows)
+            if metrics_file:
+                METRICS.write_textfile(metrics_file)
+            polls += 1
+            if count is None or polls < count:
+                await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Poll the coin listing and record rows that changed")
+    parser.add_argument("--url", default=URL)
+    parser.add_argument("--interval", type=float, default=60.0, help="seconds between polls")
+    parser.add_argument("--count", type=int, default=None, help="stop after this many polls")
+    parser.add_argument("--output", default="coins.db",
+                        help="snapshot store (.db) or CSV file the changed rows are appended to")
+    parser.add_argument("--metrics-log", help="append per-stage JSON lines to this file, - for stderr")
+    parser.add_argument("--metrics-file", help="keep Prometheus-style stage totals in this text file")
+    args = parser.parse_args(argv)
+    if args.metrics_log or args.metrics_file:
+        configure(args.metrics_log)
+
+    store = SnapshotStore(args.output) if args.output.endswith(".db") else None
+
+    def on_change(stamp, rows):
+        if store is not None:
+            store.append(stamp, rows)
+        else:
+            append_csv(args.output, stamp, rows)
+        print(stamp + ": " + str(len(rows)) + " rows changed")
+
+    try:
+        asyncio.run(run(Poller(args.url), args.interval, on_change, args.count, metrics_file=args.metrics_file))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if store is not None:
+            store.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
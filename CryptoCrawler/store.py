@@ -0,0 +1,147 @@
+import argparse
+import csv
+import os
+import sqlite3
+import sys
+from extract import Row
+from metrics import METRICS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    time TEXT NOT NULL,
+    coin TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    price REAL,
+    diff REAL,
+    volume REAL,
+    PRIMARY KEY (coin, symbol, time)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS snapshots_time ON snapshots (time);
+"""
+
+COLUMNS = ["time", "coin", "symbol", "price", "diff", "volume"]
+
+def removed(coin, symbol):
+    "The tombstone row recorded when a coin leaves the listing: price, diff and volume all NULL"
+    return Row(coin, symbol, None, None, None)
+
+def is_removed(row):
+    return row.price is None and row.diff is None and row.volume is None
+
+class SnapshotStore():
+    """
+        Every snapshot in one SQLite file, one row per coin and timestamp with
+        numeric price, diff (percent) and volume columns. Times are
+        'YYYY-MM-DD HH:MM:SS' strings, so they sort and compare as text. The
+        primary key clusters a coin's history together and a second index
+        serves queries by time alone.
+    """
+
+    def __init__(self, path="coins.db"):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.db.close()
+
+    def append(self, stamp, rows):
+        "Adds rows under one timestamp in a single transaction. A repeated (coin, time) replaces the old row"
+        with METRICS.stage("store") as stage, self.db:
+            self.db.executemany("INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?, ?, ?)",
+                                ((stamp, *row) for row in rows))
+            stage.rows = len(rows)
+
+    def query(self, start=None, end=None, coin=None):
+        """
+            Yields (time, Row) in time order for start <= time <= end, either
+            bound optional. An end without a time of day covers the whole day.
+            coin matches the coin name or the symbol.
+        """
+        where, params = [], []
+        if start is not None:
+            where.append("time >= ?")
+            params.append(start)
+        if end is not None:
+            if len(end) == 10:
+                end += " 23:59:59"
+            where.append("time <= ?")
+            params.append(end)
+        if coin is not None:
+            where.append("(coin = ? OR symbol = ?)")
+            params += [coin, coin]
+        sql = "SELECT " + ", ".join(COLUMNS) + " FROM snapshots"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        for record in self.db.execute(sql + " ORDER BY time, coin", params):
+            yield record[0], Row(*record[1:])
+
+    def latest(self, at=None):
+        """
+            The newest Row of every coin at or before time at (default: now),
+            which rebuilds a full snapshot from change-only appends. Coins
+            whose newest row is a tombstone (see removed) had left the listing
+            and are skipped.
+        """
+        sql = "SELECT " + ", ".join(COLUMNS[1:]) + ", max(time) FROM snapshots"
+        params = []
+        if at is not None:
+            sql += " WHERE time <= ?"
+            params.append(at)
+        rows = [Row(*record[:-1]) for record in self.db.execute(sql + " GROUP BY coin, symbol ORDER BY coin", params)]
+        return [row for row in rows if not is_removed(row)]
+
+    def times(self):
+        "Every snapshot timestamp, oldest first"
+        return [t for t, in self.db.execute("SELECT DISTINCT time FROM snapshots ORDER BY time")]
+
+    def export_excel(self, path, start=None, end=None, coin=None):
+        "Writes the matching rows to an Excel file, one line per coin and time"
+        records = [[t, *row] for t, row in self.query(start, end, coin)]
+        write_excel(path, records)
+        return len(records)
+
+def write_excel(path, records):
+    "Writes [time, coin, symbol, price, diff, volume] records to an Excel file; pandas is only imported here"
+    with METRICS.stage("excel") as stage:
+        import pandas as pd
+        pd.DataFrame(records, columns=COLUMNS).to_excel(path, index=False)
+        stage.rows = len(records)
+
+def append_csv(path, stamp, rows):
+    "Appends rows under one timestamp to a CSV file, writing the header for a new file"
+    new = not os.path.exists(path)
+    with METRICS.stage("csv") as stage, open(path, "a", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        if new:
+            writer.writerow(COLUMNS)
+        writer.writerows([stamp, *row] for row in rows)
+        stage.rows = len(rows)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query or export the snapshot store")
+    parser.add_argument("command", choices=["query", "export"])
+    parser.add_argument("--db", default="coins.db")
+    parser.add_argument("--start", help="first time to include, e.g. 2023-04-23 or '2023-04-23 12:00:00'")
+    parser.add_argument("--end", help="last time to include")
+    parser.add_argument("--coin", help="coin name or symbol")
+    parser.add_argument("--output", default="coins.xlsx", help="Excel file for export")
+    args = parser.parse_args(argv)
+
+    with SnapshotStore(args.db) as store:
+        if args.command == "export":
+            count = store.export_excel(args.output, args.start, args.end, args.coin)
+            print(str(count) + " rows saved to " + args.output)
+        else:
+            for t, row in store.query(args.start, args.end, args.coin):
+                print(t + "  " + "  ".join(str(v) for v in row))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
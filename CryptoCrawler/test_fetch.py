@@ -0,0 +1,134 @@
+""" Tests for fetch.py against a local aiohttp stand-in server """
+
+import asyncio
+import time
+import pytest
+from aiohttp import web
+from fetch import FetchError, fetch_all
+
+class StandIn():
+    "A local server whose /page/{n} handler is given by the test; counts calls and concurrent requests"
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.calls = {}
+        self.in_flight = 0
+        self.peak = 0
+
+    async def handle(self, request):
+        n = int(request.match_info["n"])
+        self.calls[n] = self.calls.get(n, 0) + 1
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            return await self.handler(n, self.calls[n])
+        finally:
+            self.in_flight -= 1
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_get("/page/{n}", self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = self.runner.addresses[0][1]
+        self.base = "http://127.0.0.1:" + str(port) + "/page/"
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.runner.cleanup()
+
+    def urls(self, count):
+        return [self.base + str(n) for n in range(count)]
+
+def run(handler, count, **kwargs):
+    """
+        Fetches count pages from a stand-in serving handler. Returns (pages or
+        the FetchError, server), with the fetch's wall time in server.elapsed.
+    """
+    async def main():
+        async with StandIn(handler) as server:
+            start = time.perf_counter()
+            try:
+                result = await fetch_all(server.urls(count), **kwargs)
+            except FetchError as e:
+                result = e
+            server.elapsed = time.perf_counter() - start
+            return result, server
+    return asyncio.run(main())
+
+def test_results_keep_the_order_of_urls():
+    async def handler(n, call):
+        # later pages answer first
+        await asyncio.sleep(0.01 * (10 - n))
+        return web.Response(text="page " + str(n))
+
+    pages, _ = run(handler, 10)
+    assert [page.text for page in pages] == ["page " + str(n) for n in range(10)]
+    assert all(page.status == 200 for page in pages)
+
+def test_concurrency_caps_requests_in_flight():
+    async def handler(n, call):
+        await asyncio.sleep(0.05)
+        return web.Response(text="ok")
+
+    pages, server = run(handler, 12, concurrency=3)
+    assert len(pages) == 12
+    assert server.peak == 3
+
+@pytest.mark.parametrize("status", [429, 500, 502, 503, 504])
+def test_retry_statuses_are_retried(status):
+    async def handler(n, call):
+        return web.Response(status=status) if call < 3 else web.Response(text="ok")
+
+    pages, server = run(handler, 2, retries=3, backoff=0.01)
+    assert [page.text for page in pages] == ["ok", "ok"]
+    assert server.calls == {0: 3, 1: 3}
+
+def test_other_statuses_are_returned_without_retrying():
+    async def handler(n, call):
+        return web.Response(status=404, text="missing")
+
+    pages, server = run(handler, 1, retries=3, backoff=0.01)
+    assert pages[0].status == 404
+    assert server.calls == {0: 1}
+
+def test_backoff_doubles_between_tries():
+    async def handler(n, call):
+        return web.Response(status=503)
+
+    error, server = run(handler, 1, retries=2, backoff=0.1)
+    assert isinstance(error, FetchError)
+    # waits of 0.1 and 0.2 seconds, each with up to 50% jitter
+    assert 0.3 <= server.elapsed < 0.45 + 0.5
+    assert server.calls == {0: 3}
+
+def test_exhausted_retries_raise_fetch_error():
+    async def handler(n, call):
+        return web.Response(status=500)
+
+    error, server = run(handler, 1, retries=2, backoff=0.01)
+    assert isinstance(error, FetchError)
+    assert "after 3 tries" in str(error) and "HTTP 500" in str(error)
+    assert server.calls == {0: 3}
+
+def test_timeouts_are_retried():
+    async def handler(n, call):
+        if call == 1:
+            await asyncio.sleep(1)
+        return web.Response(text="ok")
+
+    pages, server = run(handler, 1, timeout=0.2, retries=1, backoff=0.01)
+    assert pages[0].text == "ok"
+    assert server.calls == {0: 2}
+
+def test_timeouts_raise_fetch_error_when_out_of_tries():
+    async def handler(n, call):
+        await asyncio.sleep(1)
+        return web.Response(text="too late")
+
+    error, server = run(handler, 1, timeout=0.2, retries=0)
+    assert isinstance(error, FetchError)
+    assert "TimeoutError" in str(error)
+    assert server.elapsed < 1
@@ -0,0 +1,133 @@
+""" Bitboard game state: each player's cells as bits cols * row + column of one integer """
+
+FULL = (1 << 9) - 1
+
+# every winning line of the 3x3 board as a mask
+WIN_LINES = [sum(1 << i for i in line) for line in
+             [(0, 1, 2), (3, 4, 5), (6, 7, 8), (0, 3, 6), (1, 4, 7), (2, 5, 8), (0, 4, 8), (2, 4, 6)]]
+
+def is_win(mask):
+    "Whether the cells in mask contain a whole 3x3 line"
+    for line in WIN_LINES:
+        if mask & line == line:
+            return True
+    return False
+
+# (rows, cols, k) -> windows through each cell, shared by every board of that shape
+_GEOMETRY = {}
+
+def windows(rows, cols, k):
+    """
+        For each cell, the ids of the length-k windows (row, column or diagonal
+        runs of k cells) that contain it: at most 4 * k per cell, however big
+        the board. Returns (number of windows, per-cell id lists).
+    """
+    shape = (rows, cols, k)
+    if shape not in _GEOMETRY:
+        through = [[] for _ in range(rows * cols)]
+        count = 0
+        for dy, dx in ((0, 1), (1, 0), (1, 1), (1, -1)):
+            for y in range(rows):
+                for x in range(cols):
+                    end_y, end_x = y + dy * (k - 1), x + dx * (k - 1)
+                    if 0 <= end_y < rows and 0 <= end_x < cols:
+                        for step in range(k):
+                            through[cols * (y + dy * step) + x + dx * step].append(count)
+                        count += 1
+        _GEOMETRY[shape] = (count, [tuple(w) for w in through])
+    return _GEOMETRY[shape]
+
+class Board():
+    """
+        An m,n,k game position (rows x cols, k in a row wins; 3, 3, 3 is
+        tic-tac-toe) as two bitmasks, x and o, with cells indexed
+        cols * y + x. Every window of k cells keeps a running count of each
+        player's pieces in it, so a move updates and tests only the windows
+        through its own cell: the cost per move depends on k, not on the
+        board size, and result() is a lookup.
+    """
+
+    __slots__ = ("rows", "cols", "k", "x", "o", "through", "counts", "winner", "filled")
+
+    def __init__(self, rows=3, cols=3, k=3):
+        self.rows, self.cols, self.k = rows, cols, k
+        self.x = self.o = 0
+        count, self.through = windows(rows, cols, k)
+        self.counts = {"X": [0] * count, "O": [0] * count}
+        self.winner = None
+        self.filled = 0
+
+    def copy(self):
+        board = Board.__new__(Board)
+        board.rows, board.cols, board.k, board.x, board.o = self.rows, self.cols, self.k, self.x, self.o
+        board.through, board.winner, board.filled = self.through, self.winner, self.filled
+        board.counts = {"X": self.counts["X"][:], "O": self.counts["O"][:]}
+        return board
+
+    def size(self):
+        return self.rows * self.cols
+
+    def mask(self, player):
+        return self.x if player == "X" else self.o
+
+    def cell(self, y, x):
+        "0, 'X' or 'O' at row y, column x"
+        bit = 1 << (self.cols * y + x)
+        return "X" if self.x & bit else "O" if self.o & bit else 0
+
+    def empty(self):
+        "Mask of the free cells"
+        return ((1 << self.size()) - 1) & ~(self.x | self.o)
+
+    def moves(self):
+        "Indices of the free cells"
+        free = self.empty()
+        return [i for i in range(self.size()) if free >> i & 1]
+
+    def place(self, y, x, player):
+        "Puts player's piece at row y, column x. Returns 1 if the cell was free, otherwise 0"
+        if not (0 <= y < self.rows and 0 <= x < self.cols) or (self.x | self.o) >> (self.cols * y + x) & 1:
+            return 0
+        self.play(self.cols * y + x, player)
+        return 1
+
+    def play(self, i, player):
+        "Puts player's piece on free cell i and updates the windows through it"
+        if player == "X":
+            self.x |= 1 << i
+        else:
+            self.o |= 1 << i
+        self.filled += 1
+        counts, k = self.counts[player], self.k
+        for w in self.through[i]:
+            counts[w] += 1
+            if counts[w] == k and self.winner is None:
+                self.winner = player
+
+    def undo(self, i):
+        "Takes back the last move, which was made on cell i"
+        player = "X" if self.x >> i & 1 else "O"
+        self.x &= ~(1 << i)
+        self.o &= ~(1 << i)
+        self.filled -= 1
+        counts, k = self.counts[player], self.k
+        for w in self.through[i]:
+            if counts[w] == k:
+                self.winner = None
+            counts[w] -= 1
+
+    def result(self):
+        "'X' or 'O' for a win, 'TIE' for a full board without one, None while the game goes on"
+        if self.winner is not None:
+            return self.winner
+        if self.filled == self.size():
+            return "TIE"
+        return None
+
+    def winning_moves(self, player):
+        "The free cells where player would complete a window of k"
+        mine = self.counts[player]
+        theirs = self.counts["O" if player == "X" else "X"]
+        free = self.empty()
+        return [i for i in range(self.size())
+                if free >> i & 1 and any(mine[w] == self.k - 1 and theirs[w] == 0 for w in self.through[i])]
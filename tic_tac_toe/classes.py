@@ -1,100 +1,54 @@
 import pygame
-import random
+import os
+from multiprocessing import Pool
+import engine
+import mcts
+import minimax
 
 class Chess(pygame.sprite.Sprite):
     
-    def __init__(self, type):
+    def __init__(self, type, cell=80, origin=(180, 30)):
+        """
+            A piece for a board drawn as a grid of cell x cell pixel squares
+            whose top left corner is at origin.
+        """
         super().__init__()
 
         #determine whether it's an 'X' or 'O'
         self.type = type
-        self.image = pygame.Surface((70, 70))
+        self.cell = cell
+        self.origin = origin
+        size = cell - 10
+        self.image = pygame.Surface((size, size))
         self.image.fill((100, 200, 150))
         self.rect = self.image.get_rect()
 
-        #draw 'X' or 'O' on surface
+        #draw 'X' or 'O' on surface, scaled from the original 70 pixel piece
+        scale = size / 70
         if self.type == "O":
             pygame.draw.circle(self.image, color=(250, 250, 250),
-                            center=(35, 35), radius=28, width=8)
+                            center=(size // 2, size // 2), radius=round(28 * scale), width=max(1, round(8 * scale)))
         elif self.type == "X":
-            pygame.draw.line(self.image, (15, 15, 15), (13, 10), (57, 60), 11)
-            pygame.draw.line(self.image, (15, 15, 15), (57, 10), (13, 60), 11)
+            pygame.draw.line(self.image, (15, 15, 15), (round(13 * scale), round(10 * scale)),
+                            (round(57 * scale), round(60 * scale)), max(1, round(11 * scale)))
+            pygame.draw.line(self.image, (15, 15, 15), (round(57 * scale), round(10 * scale)),
+                            (round(13 * scale), round(60 * scale)), max(1, round(11 * scale)))
     
     def update_board(self, surface, mouse_pos, board):
         """
-            Display chess on board according to mouse click position.
+            Display chess on board according to mouse click position. board is
+            a Board of any size, which gets the piece if the cell is free.
         """
         mouse_x, mouse_y = mouse_pos
-        valid = 0
 
-        # first column
-        if 180 <= mouse_x <= 260:
-            self.rect.centerx = 220
-            if 30 <= mouse_y <= 110:
-                # board[0][0]
-                self.rect.centery = 70
-                if board[0][0] == 0:
-                    board[0][0] = self.type
-                    valid = 1
-            elif 110 <= mouse_y <= 190:
-                # board[1][0]
-                self.rect.centery = 150
-                if board[1][0] == 0:
-                    board[1][0] = self.type
-                    valid = 1
-            elif 190 <= mouse_y <= 270:
-                # board[2][0]
-                self.rect.centery = 230
-                if board[2][0] == 0:
-                    board[2][0] = self.type
-                    valid = 1
-        
-        # second column
-        elif 260 <= mouse_x <= 340:
-            self.rect.centerx = 300
-            if 30 <= mouse_y <= 110:
-                # board[0][1]
-                self.rect.centery = 70
-                if board[0][1] == 0:
-                    board[0][1] = self.type
-                    valid = 1
-            elif 110 <= mouse_y <= 190:
-                # board[1][1]
-                self.rect.centery = 150
-                if board[1][1] == 0:
-                    board[1][1] = self.type
-                    valid = 1
-            elif 190 <= mouse_y <= 270:
-                # board[2][1]
-                self.rect.centery = 230
-                if board[2][1] == 0:
-                    board[2][1] = self.type
-                    valid = 1
-
-        # third column
-        elif 340 <= mouse_x <= 420:
-            self.rect.centerx = 380
-            if 30 <= mouse_y <= 110:
-                # board[0][2]
-                self.rect.centery = 70
-                if board[0][2] == 0:
-                    board[0][2] = self.type
-                    valid = 1
-            elif 110 <= mouse_y <= 190:
-                # board[1][2]
-                self.rect.centery = 150
-                if board[1][2] == 0:
-                    board[1][2] = self.type
-                    valid = 1
-            elif 190 <= mouse_y <= 270:
-                # board[2][2]
-                self.rect.centery = 230
-                if board[2][2] == 0:
-                    board[2][2] = self.type
-                    valid = 1
-        
-        else:
-            return board, valid
+        # find the clicked cell
+        x = (mouse_x - self.origin[0]) // self.cell
+        y = (mouse_y - self.origin[1]) // self.cell
+        if not (0 <= x < board.cols and 0 <= y < board.rows):
+            return board, 0
+        self.rect.centerx = self.origin[0] + self.cell * x + self.cell // 2
+        self.rect.centery = self.origin[1] + self.cell * y + self.cell // 2
+        valid = board.place(y, x, self.type)
 
         # update graphics only if the move is valid
         if valid:
@@ -103,9 +57,23 @@ class Chess(pygame.sprite.Sprite):
         return board, valid
 
 class AI():
-    def __init__(self, type):
+    def __init__(self, type, mode="basic", time_budget=None, playouts=None, processes=None):
+        """
+            mode "basic" wins or blocks when it can and otherwise plays at random,
+            "perfect" plays minimax moves from a table solved once at start-up
+            (3x3 boards only), "mcts" runs Monte Carlo Tree Search on any board
+            for time_budget seconds or a number of playouts per move (1 second
+            if neither is given; with both, whichever runs out first), spread
+            over a pool of processes (default: one per core).
+        """
         self.type = type
-        self.opponent = "X" if self.type == "O" else "O"
+        self.mode = mode
+        self.time_budget = 1.0 if time_budget is None and playouts is None else time_budget
+        self.playouts = playouts
+        self.processes = processes or os.cpu_count() or 1
+        self.pool = None
+        if mode == "perfect":
+            minimax.warm_up()
     
     def play(self, background, board):
         """ 
@@ -113,114 +81,38 @@ class AI():
             updates the screen as well.
         """
 
-        # check game ending conditions at each spot, block opponent from winning / make the winning move
-        if self.necessary_position(board) is not None:
-            y, x = self.necessary_position(board)
-        
-        # else, make a random move
-        else:
-            possible_moves = []
-            for i in range(3):
-                for j in range(3):
-                    if board[i][j] == 0:
-                        possible_moves.append((i, j))
+        # tree search, on a process pool kept for the whole game
+        if self.mode == "mcts":
+            if self.pool is None and self.processes > 1:
+                self.pool = Pool(self.processes)
+            y, x = mcts.best_move(board, self.type, self.playouts, self.time_budget, self.processes, self.pool)
 
-            # randomly choose an empty location
-            y, x = random.choice(possible_moves)
+        # perfect play looks the move up in the solved game; basic play wins or
+        # blocks when it can, otherwise makes a random move
+        else:
+            y, x = divmod(engine.PLAYERS[self.mode](board, self.type), board.cols)
         
+        # create a chess object to play move
+        chess = Chess(self.type)
+
         # calculate mouse position
-        mouse_x = 220 + 80 * x
-        mouse_y = 70 + 80 * y
+        mouse_x = chess.origin[0] + chess.cell * x + chess.cell // 2
+        mouse_y = chess.origin[1] + chess.cell * y + chess.cell // 2
         mouse_pos = (mouse_x, mouse_y)
 
-        # create a chess object to play move
-        chess = Chess(self.type)
         board, _ = chess.update_board(background, mouse_pos, board)
 
         return board
 
-    def necessary_position(self, board):
-        """
-            determine if there is a position where AI can block the opponent from winning or win. return the position (y, x). (board[y][x] is the position)
-        """
-
-        # if player is winning, set this variable to 1
-        player_winning = 0
-        
-        # check each empty position
-        for i in range(3):
-            for j in range(3):
-                if board[i][j] == 0:
-                    # check AI win
-                    board[i][j] = self.type
-                    if check_end(board) == self.type:
-                        # AI winning, make move at the position
-                        board[i][j] = 0
-                        return (i, j)
-
-                    # check player win
-                    board[i][j] = self.opponent
-                    if check_end(board) == self.opponent:
-                        # player winning, wait and see if AI can win
-                        board[i][j] = 0
-                        y, x = i, j
-                        player_winning = 1
-                    
-                    # clear position
-                    board[i][j] = 0
-                    
-        # if player is winning and AI cannot win, block player
-        if player_winning:
-            return (y, x)
-        
-        # No player is winning, return nothing
-        return None
+    def close(self):
+        "Shuts down the process pool of an \"mcts\" AI; a later move starts a new one"
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
 
 """ Game functions """
 
 def check_end(board):
-    """ check if the game ending conditions have been met """
-    for i in range(3):
-        # check row by row
-        first = board[i][0]
-        for j in range(1, 3):
-            if board[i][j] != first or board[i][j] == 0:
-                break
-            if j == 2:
-                return board[i][j]
-    
-        # check column by column
-        first = board[0][i]
-        for j in range(1, 3):
-            if board[j][i] != first or board[j][i] == 0:
-                break
-            if j == 2:
-                return board[j][i]
-    
-    # check diagonally
-    first = board[0][0]
-    for i in range(1, 3):
-        if board[i][i] != first or board[i][i] == 0:
-            break
-        if i == 2:
-            return board[i][i]
-    
-    first = board[0][2]
-    for i in range(1, 3):
-        if board[i][2-i] != first or board[i][2-i] == 0:
-            break
-        if i == 2:
-            return board[i][2-i]
-
-    # check if the board is full
-    is_full = True
-    for i in range(3):
-        for j in range(3):
-            if board[i][j] == 0:
-                is_full = False
-
-    # tie if board is full and there is no winner
-    if is_full:
-        return "TIE"
-
-    return None
+    """ check if the game ending conditions have been met: "X", "O", "TIE" or None """
+    return board.result()
@@ -0,0 +1,51 @@
+""" Headless game engine: move choosers and whole games on a Board, without pygame """
+
+import random
+import mcts
+import minimax
+from board import Board
+
+def other(player):
+    return "O" if player == "X" else "X"
+
+def random_move(board, player, rng=random):
+    return rng.choice(board.moves())
+
+def forced_move(board, player):
+    "A cell that wins for player, else one that blocks the opponent's win, else None"
+    for side in (player, other(player)):
+        moves = board.winning_moves(side)
+        if moves:
+            return moves[0]
+    return None
+
+def basic_move(board, player, rng=random):
+    "Wins or blocks when it can, otherwise plays at random"
+    move = forced_move(board, player)
+    return move if move is not None else random_move(board, player, rng)
+
+def perfect_move(board, player, rng=None):
+    y, x = minimax.best_move(board, player)
+    return board.cols * y + x
+
+def mcts_move(board, player, rng=random, playouts=200):
+    "Single-process MCTS with a fixed playout budget, so self-play workers do not nest pools"
+    y, x = mcts.best_move(board, player, playouts, None, processes=1, seed=rng.randrange(1 << 30))
+    return board.cols * y + x
+
+# name -> move(board, player, rng) returning a cell index
+PLAYERS = {
+    "random": random_move,
+    "basic": basic_move,
+    "perfect": perfect_move,
+    "mcts": mcts_move,
+}
+
+def play_game(x_move, o_move, rows=3, cols=3, k=3, rng=random):
+    "Plays one game between two move functions and returns 'X', 'O' or 'TIE'"
+    board = Board(rows, cols, k)
+    turn, move = "X", x_move
+    while board.result() is None:
+        board.play(move(board, turn, rng), turn)
+        turn, move = ("O", o_move) if turn == "X" else ("X", x_move)
+    return board.result()
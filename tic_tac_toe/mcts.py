@@ -0,0 +1,161 @@
+""" Monte Carlo Tree Search player with UCT selection and root parallelization over a process pool """
+
+import argparse
+import math
+import os
+import random
+import sys
+import time
+from multiprocessing import Pool
+from board import Board
+
+class Node():
+    "A tree node: the position after move, made by player, with its playout statistics"
+
+    __slots__ = ("move", "player", "parent", "children", "untried", "visits", "wins")
+
+    def __init__(self, move, player, parent, untried):
+        self.move = move
+        self.player = player
+        self.parent = parent
+        self.children = []
+        self.untried = untried
+        self.visits = 0
+        self.wins = 0.0
+
+    def select(self, c):
+        "The child with the highest UCT score"
+        log_n = math.log(self.visits)
+        return max(self.children, key=lambda n: n.wins / n.visits + c * math.sqrt(log_n / n.visits))
+
+def other(player):
+    return "O" if player == "X" else "X"
+
+def search(board, player, playouts=None, time_budget=None, seed=None, c=1.4):
+    """
+        Grows one UCT tree from board with player to move until playouts
+        have been run or time_budget seconds have passed, whichever is set
+        (1000 playouts if neither). Each playout plays random moves to the end;
+        a win counts 1 for the side that made it, a tie 0.5. Returns
+        ({move: (visits, wins)} of the root's children, playouts run).
+    """
+    rng = random.Random(seed)
+    if playouts is None and time_budget is None:
+        playouts = 1000
+    deadline = time.perf_counter() + time_budget if time_budget is not None else None
+    root = Node(None, other(player), None, board.moves())
+    rng.shuffle(root.untried)
+
+    done = 0
+    while (playouts is None or done < playouts) and (deadline is None or done % 16 or time.perf_counter() < deadline):
+        node, state = root, board.copy()
+
+        # selection: descend through fully expanded nodes
+        while not node.untried and node.children:
+            node = node.select(c)
+            state.play(node.move, node.player)
+
+        # expansion: one new child, unless the game is over here
+        if node.untried and state.result() is None:
+            move = node.untried.pop()
+            mover = other(node.player)
+            state.play(move, mover)
+            untried = state.moves() if state.result() is None else []
+            rng.shuffle(untried)
+            child = Node(move, mover, node, untried)
+            node.children.append(child)
+            node = child
+
+        # simulation: random moves until the game ends
+        turn = other(node.player)
+        free = state.moves()
+        rng.shuffle(free)
+        while state.result() is None:
+            state.play(free.pop(), turn)
+            turn = other(turn)
+        result = state.result()
+
+        # backpropagation, scored for the player who moved into each node
+        while node is not None:
+            node.visits += 1
+            if result == node.player:
+                node.wins += 1
+            elif result == "TIE":
+                node.wins += 0.5
+            node = node.parent
+        done += 1
+
+    return {n.move: (n.visits, n.wins) for n in root.children}, done
+
+def _search(args):
+    return search(*args)
+
+def merge(results):
+    "Sums root statistics from several trees into {move: [visits, wins]} and the total playouts"
+    stats, total = {}, 0
+    for children, done in results:
+        total += done
+        for move, (visits, wins) in children.items():
+            entry = stats.setdefault(move, [0, 0.0])
+            entry[0] += visits
+            entry[1] += wins
+    return stats, total
+
+def best_move(board, player, playouts=None, time_budget=1.0, processes=None, pool=None, seed=None, c=1.4):
+    """
+        The (y, x) of the most visited root move after a root-parallel search:
+        every worker grows its own tree from board (with its own seed) and the
+        root statistics are summed. playouts is the total over all workers.
+        processes is the number of trees (default: all cores). Pass a Pool of
+        that many workers to reuse it between moves; otherwise one is made
+        for this move.
+    """
+    workers = processes or os.cpu_count() or 1
+    base = random.randrange(1 << 30) if seed is None else seed
+    share = None if playouts is None else -(-playouts // workers)
+    jobs = [(board, player, share, time_budget, base + w, c) for w in range(workers)]
+    if workers == 1:
+        results = [_search(jobs[0])]
+    elif pool is not None:
+        results = pool.map(_search, jobs)
+    else:
+        with Pool(workers) as own:
+            results = own.map(_search, jobs)
+    stats, _ = merge(results)
+    move = max(stats, key=lambda m: stats[m][0])
+    return divmod(move, board.cols)
+
+def benchmark(rows=15, cols=15, k=5, time_budget=2.0, counts=None):
+    """
+        Playouts per second from an empty rows x cols board, for each pool
+        size 1, 2, 4, ... up to the core count, with the rate per core in use.
+    """
+    cores = os.cpu_count() or 1
+    counts = counts or sorted({p for p in (1, 2, 4, 8, 16, 32, 64) if p <= cores} | {cores})
+    board = Board(rows, cols, k)
+    print(str(rows) + "x" + str(cols) + ", " + str(k) + " in a row, " + str(time_budget) + "s per move")
+    for p in counts:
+        jobs = [(board, "X", None, time_budget, seed, 1.4) for seed in range(p)]
+        with Pool(p) as pool:
+            # warm the workers up so process start-up is not counted
+            pool.map(_search, [(board, "X", 1, None, 0, 1.4)] * p)
+            start = time.perf_counter()
+            _, total = merge(pool.map(_search, jobs))
+            elapsed = time.perf_counter() - start
+        rate = total / elapsed
+        print("    " + str(p) + " processes: " + str(total) + " playouts, " + str(round(rate)) + " playouts/s, "
+              + str(round(rate / min(p, cores))) + " playouts/s/core")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MCTS playouts per second per core")
+    parser.add_argument("--rows", type=int, default=15)
+    parser.add_argument("--cols", type=int, default=15)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--time", type=float, default=2.0, help="seconds of search per measurement")
+    parser.add_argument("--processes", type=int, nargs="+", default=None)
+    args = parser.parse_args(argv)
+    benchmark(args.rows, args.cols, args.k, args.time, args.processes)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
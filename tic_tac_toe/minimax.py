@@ -0,0 +1,101 @@
+""" Perfect play for tic-tac-toe: negamax with alpha-beta and a symmetry-folded transposition table """
+
+from board import FULL, is_win
+
+# the 8 symmetries of the square as index maps: cell c of the image is cell perm[c] of the board
+def _rotate(perm):
+    return tuple(perm[3 * (2 - c) + r] for r in range(3) for c in range(3))
+
+def _mirror(perm):
+    return tuple(perm[3 * r + 2 - c] for r in range(3) for c in range(3))
+
+SYMMETRIES = []
+for p in (tuple(range(9)), _mirror(tuple(range(9)))):
+    for _ in range(4):
+        SYMMETRIES.append(p)
+        p = _rotate(p)
+
+# TRANSFORMS[s][mask] is the image of a 9 bit mask under symmetry s
+TRANSFORMS = [[sum(1 << c for c in range(9) if mask >> perm[c] & 1) for mask in range(1 << 9)]
+              for perm in SYMMETRIES]
+
+# try the centre, then corners, then edges: strong moves first prune the most
+MOVE_ORDER = (4, 0, 2, 6, 8, 1, 3, 5, 7)
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# canonical position -> (value, flag, best move in canonical coordinates)
+TABLE = {}
+_solved = False
+
+def canonical(me, other):
+    "Returns (smallest key of the 8 symmetric images of the position, the symmetry that produced it)"
+    return min(((T[me] << 9) | T[other], s) for s, T in enumerate(TRANSFORMS))
+
+def search(me, other, alpha=-10, beta=10):
+    """
+        Negamax value of the position where the player to move holds the cells
+        in mask me and the opponent those in other, and the best move as a
+        cell index. A win scores 1 + the number of empty cells left, so
+        quicker wins and slower losses are preferred; a tie scores 0. Entries
+        are shared by all 8 symmetric positions and record whether the value
+        is exact or only a bound from an alpha-beta cutoff.
+    """
+    key, s = canonical(me, other)
+    entry = TABLE.get(key)
+    if entry is not None:
+        value, flag, move = entry
+        if flag == EXACT or (flag == LOWER and value >= beta) or (flag == UPPER and value <= alpha):
+            return value, (SYMMETRIES[s][move] if move is not None else None)
+
+    free = FULL & ~(me | other)
+    if is_win(other):
+        return -(1 + bin(free).count("1")), None
+    if not free:
+        return 0, None
+
+    start_alpha = alpha
+    best, best_move = -10, None
+    for i in MOVE_ORDER:
+        if not free >> i & 1:
+            continue
+        value = -search(other, me | 1 << i, -beta, -alpha)[0]
+        if value > best:
+            best, best_move = value, i
+        alpha = max(alpha, value)
+        if alpha >= beta:
+            break
+
+    flag = UPPER if best <= start_alpha else LOWER if best >= beta else EXACT
+    TABLE[key] = (best, flag, SYMMETRIES[s].index(best_move))
+    return best, best_move
+
+def warm_up():
+    """
+        Solves every reachable position with a full window, so each later
+        best_move is a single exact table lookup. There are 627 canonical
+        non-final positions; this runs once per process.
+    """
+    global _solved
+    if _solved:
+        return
+    seen = set()
+    stack = [(0, 0)]
+    while stack:
+        me, other = stack.pop()
+        key = canonical(me, other)[0]
+        free = FULL & ~(me | other)
+        if key in seen or is_win(other) or not free:
+            continue
+        seen.add(key)
+        search(me, other)
+        stack.extend((other, me | 1 << i) for i in range(9) if free >> i & 1)
+    _solved = True
+
+def best_move(board, player):
+    "The (y, x) of a perfect move for player ('X' or 'O') on a 3x3 Board"
+    if (board.rows, board.cols, board.k) != (3, 3, 3):
+        raise ValueError("minimax only solves 3x3 tic-tac-toe, not a " + str(board.rows) + "x"
+                         + str(board.cols) + " board with " + str(board.k) + " in a row")
+    opponent = "O" if player == "X" else "X"
+    return divmod(search(board.mask(player), board.mask(opponent))[1], 3)
@@ -0,0 +1,173 @@
+""" Headless self-play: AI strength and speed regression runs without pygame """
+
+import argparse
+import random
+import sys
+import time
+from multiprocessing import Pool
+import minimax
+from board import FULL, WIN_LINES, Board
+from engine import PLAYERS, forced_move, play_game
+
+def _play_batch(args):
+    """
+        Plays games between players a and b, a taking X in even games and O in
+        odd ones. Returns [wins, draws, losses] for a.
+    """
+    a, b, first, games, shape, seed = args
+    rng = random.Random(seed)
+    if "perfect" in (a, b):
+        minimax.warm_up()
+    tally = [0, 0, 0]
+    for g in range(first, first + games):
+        a_side = "X" if g % 2 == 0 else "O"
+        x, o = (PLAYERS[a], PLAYERS[b]) if a_side == "X" else (PLAYERS[b], PLAYERS[a])
+        result = play_game(x, o, *shape, rng=rng)
+        tally[1 if result == "TIE" else 0 if result == a_side else 2] += 1
+    return tally
+
+def self_play(a, b, games, processes=None, batch=1000, shape=(3, 3, 3), seed=0):
+    """
+        Plays games between two PLAYERS names on a process pool, batch games per
+        task. Returns ([wins, draws, losses] for a, seconds).
+    """
+    jobs = [(a, b, first, min(batch, games - first), shape, seed + first) for first in range(0, games, batch)]
+    start = time.perf_counter()
+    if processes == 1:
+        results = [_play_batch(job) for job in jobs]
+    else:
+        with Pool(processes) as pool:
+            results = pool.map(_play_batch, jobs)
+    return [sum(r[i] for r in results) for i in range(3)], time.perf_counter() - start
+
+# numpy is only imported by the vectorized 3x3 path, so pool self-play runs without it
+_LOOKUPS = None
+
+def _lookups():
+    """
+        (code, won, bits) for 3x3 vectorized play, built on first use: the
+        base-3 code of every 9 bit mask, so a position is looked up as
+        code[x] + 2 * code[o], whether a mask holds a line, and each cell's bit.
+    """
+    global _LOOKUPS
+    if _LOOKUPS is None:
+        import numpy as np
+        code = np.array([sum(3 ** i for i in range(9) if m >> i & 1) for m in range(1 << 9)], dtype=np.int32)
+        won = np.array([any(m & line == line for line in WIN_LINES) for m in range(1 << 9)])
+        bits = (1 << np.arange(9)).astype(np.int32)
+        _LOOKUPS = code, won, bits
+    return _LOOKUPS
+
+def policy_table(name):
+    """
+        The move of a 3x3 player for every position, indexed by base-3 code,
+        with the side to move given by the piece counts. -1 marks positions
+        where it plays at random (always for "random"); "mcts" is not
+        tabulated.
+    """
+    import numpy as np
+    code, won, _ = _lookups()
+    table = np.full(3 ** 9, -1, dtype=np.int8)
+    if name == "random":
+        return table
+    if name not in ("basic", "perfect"):
+        raise ValueError("No vectorized 3x3 policy for " + repr(name))
+    if name == "perfect":
+        minimax.warm_up()
+    for x in range(1 << 9):
+        for o in range(1 << 9):
+            if x & o or not 0 <= bin(x).count("1") - bin(o).count("1") <= 1:
+                continue
+            if won[x] or won[o] or x | o == FULL:
+                continue
+            player = "X" if bin(x).count("1") == bin(o).count("1") else "O"
+            board = Board()
+            for i in range(9):
+                if x >> i & 1:
+                    board.play(i, "X")
+                elif o >> i & 1:
+                    board.play(i, "O")
+            if name == "perfect":
+                y, col = minimax.best_move(board, player)
+                move = 3 * y + col
+            else:
+                move = forced_move(board, player)
+            table[code[x] + 2 * code[o]] = -1 if move is None else move
+    return table
+
+def self_play_vectorized(a, b, games, seed=0):
+    """
+        Plays all games at once as numpy arrays of bitmasks, one ply per step
+        for every unfinished game, with each player's moves read from its
+        policy_table. 3x3 only. Returns ([wins, draws, losses] for a, seconds),
+        a taking X in the first half of the games.
+    """
+    import numpy as np
+    code, won, bits = _lookups()
+    tables = {name: policy_table(name) for name in {a, b}}
+    rng = np.random.default_rng(seed)
+    start = time.perf_counter()
+    a_is_x = np.arange(games) < (games + 1) // 2
+    x = np.zeros(games, dtype=np.int32)
+    o = np.zeros(games, dtype=np.int32)
+    result = np.zeros(games, dtype=np.int8)  # 0 running, 1 X won, 2 O won, 3 tie
+    for ply in range(9):
+        live = np.flatnonzero(result == 0)
+        if len(live) == 0:
+            break
+        position = code[x[live]] + 2 * code[o[live]]
+        mover_is_a = a_is_x[live] if ply % 2 == 0 else ~a_is_x[live]
+        move = np.where(mover_is_a, tables[a][position], tables[b][position]).astype(np.int64)
+
+        # random picks: the free cell with the highest random key
+        pick = move < 0
+        if pick.any():
+            occupied = ((x[live[pick], None] | o[live[pick], None]) & bits) != 0
+            keys = rng.random((pick.sum(), 9))
+            keys[occupied] = -1
+            move[pick] = keys.argmax(axis=1)
+
+        if ply % 2 == 0:
+            x[live] |= bits[move]
+            result[live[won[x[live]]]] = 1
+        else:
+            o[live] |= bits[move]
+            result[live[won[o[live]]]] = 2
+    result[result == 0] = 3
+
+    a_won = np.where(a_is_x, result == 1, result == 2)
+    b_won = np.where(a_is_x, result == 2, result == 1)
+    tally = [int(a_won.sum()), int((result == 3).sum()), int(b_won.sum())]
+    return tally, time.perf_counter() - start
+
+def report(a, b, tally, seconds):
+    games = sum(tally)
+    print(a + " vs " + b + ": " + str(games) + " games, win " + str(round(100 * tally[0] / games, 2)) + "%, draw "
+          + str(round(100 * tally[1] / games, 2)) + "%, loss " + str(round(100 * tally[2] / games, 2)) + "%, "
+          + str(round(games / seconds)) + " games/s")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless AI vs AI self-play")
+    parser.add_argument("a", choices=list(PLAYERS), help="player whose win / draw / loss rates are reported")
+    parser.add_argument("b", choices=list(PLAYERS))
+    parser.add_argument("--games", type=int, default=100000)
+    parser.add_argument("--processes", type=int, default=None, help="pool size, default one per core")
+    parser.add_argument("--batch", type=int, default=1000, help="games per pool task")
+    parser.add_argument("--rows", type=int, default=3)
+    parser.add_argument("--cols", type=int, default=3)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--vectorized", action="store_true",
+                        help="play every game at once with numpy (3x3, random / basic / perfect)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.vectorized:
+        tally, seconds = self_play_vectorized(args.a, args.b, args.games, args.seed)
+    else:
+        tally, seconds = self_play(args.a, args.b, args.games, args.processes, args.batch,
+                                   (args.rows, args.cols, args.k), args.seed)
+    report(args.a, args.b, tally, seconds)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
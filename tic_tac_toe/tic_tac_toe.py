@@ -2,6 +2,7 @@ import pygame
 import random
 from pygame.locals import *
 from classes import Chess, AI, check_end
+from board import Board
 
 #initialize game variables
 game_active = 0
@@ -10,13 +11,15 @@ font_size = 26
 now_playing = "X"           # first player is always "X"
 mode = None
 FPS = 45
-board = [[0 for _ in range(3)] for _ in range(3)]
+ai_mode = "perfect"         # "basic" for the old win / block / random AI
+board = Board()
 
 def main():
     global board
     global now_playing
     global game_active
     global mode
+    AI_Opponent = None
 
     #initialize pygame module
     pygame.init()
@@ -65,6 +68,8 @@ def main():
     while 1:
         for event in pygame.event.get():
             if event.type == QUIT:
+                if AI_Opponent is not None:
+                    AI_Opponent.close()
                 return
             elif event.type == MOUSEBUTTONDOWN:
                 # only care for left mouse button
@@ -74,12 +79,17 @@ def main():
                         # button pressed, change mode
                         mode = select_mode(event.pos)
 
+                        # stop the previous game's AI workers, if any
+                        if AI_Opponent is not None:
+                            AI_Opponent.close()
+                            AI_Opponent = None
+
                         # if mode is AI, initialize AI
                         if mode == "AI":
-                            AI_Opponent = AI(random.choice(["X", "O"]))
+                            AI_Opponent = AI(random.choice(["X", "O"]), ai_mode)
 
                         # reset screen and board, then start a new game
-                        board = [[0 for _ in range(3)] for _ in range(3)]
+                        board = Board()
                         background = reset_background()
                         game_active = 1
                         now_playing = "X"
@@ -122,6 +132,9 @@ def main():
         if winner is not None:
             announce(winner, background)
             game_active = 0
+            # the AI's workers are not needed until the next game
+            if AI_Opponent is not None:
+                AI_Opponent.close()
 
         #clock locked at some FPS
         clock.tick(FPS)
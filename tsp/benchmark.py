@@ -0,0 +1,226 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from tsp import generate_tsp_test_case, traveling_salesman_brute_force, traveling_salesman_parallel_brute_force, tsp_solver
+from instances import random_instance, DistanceMatrix
+import numpy as np
+from held_karp import held_karp_bitmask, held_karp_layered, held_karp_batch, held_karp_sparse
+from held_karp_parallel import held_karp_parallel
+from branch_and_bound import branch_and_bound, tour_weight
+from heuristics import heuristic_tsp, EuclideanMetric, one_tree_bound
+from restricted_dp import restricted_tsp_solver
+
+# name -> (solve(instance, graph) -> weight, exact, largest n worth timing)
+SOLVERS = {
+    'brute_force': (lambda D, G: traveling_salesman_brute_force(G, 0)[1], True, 9),
+    'parallel_brute_force': (lambda D, G: traveling_salesman_parallel_brute_force(G, 0)[1], True, 13),
+    'sets': (lambda D, G: tsp_solver(G, 0), True, 13),
+    'bitmask': (lambda D, G: held_karp_bitmask(D, 0), True, 20),
+    'layered': (lambda D, G: held_karp_layered(D, 0)[1], True, 20),
+    'parallel': (lambda D, G: held_karp_parallel(D, 0)[1], True, 20),
+    'sparse': (lambda D, G: held_karp_sparse(D, 0)[1], True, 18),
+    'branch_and_bound': (lambda D, G: branch_and_bound(D, 0)[1], True, 40),
+    'heuristic': (lambda D, G: heuristic_tsp(D, 0, time_budget=1.0)[1], False, 10 ** 6),
+    'restricted': (lambda D, G: restricted_tsp_solver(D, 0)[1], False, 10 ** 6),
+}
+
+def time_call(f, *args, **kwargs):
+    "Returns (result, seconds) for one call of f"
+    start = time.perf_counter()
+    result = f(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def measure(f, *args):
+    """
+        Returns (result, seconds, peak MiB) for f. tracemalloc slows Python code
+        down, so the time comes from a clean call and the memory from a second,
+        traced one. Peak memory is what tracemalloc sees in this process, numpy
+        buffers included; worker processes of the parallel solver are not counted.
+    """
+    result, seconds = time_call(f, *args)
+    tracemalloc.start()
+    try:
+        f(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result, seconds, peak / 2 ** 20
+
+def run_suite(sizes, seeds, solvers=None, weight_limit=1000):
+    """
+        Times every solver on random instances of every size and seed, skipping
+        sizes past a solver's limit. Raises AssertionError if two exact solvers
+        disagree on an instance. Returns one record per run.
+    """
+    solvers = solvers or list(SOLVERS)
+    records = []
+    for n in sizes:
+        for seed in seeds:
+            D = random_instance(n, weight_limit, seed=seed)
+            G = D.to_networkx() if n <= 13 else None
+            optimum = None
+            for name in solvers:
+                solve, exact, limit = SOLVERS[name]
+                if n > limit or (G is None and name in ('brute_force', 'parallel_brute_force', 'sets')):
+                    continue
+                weight, seconds, peak = measure(solve, D, G)
+                records.append({'solver': name, 'n': n, 'seed': seed, 'weight': weight,
+                                'exact': exact, 'seconds': round(seconds, 6), 'peak_mib': round(peak, 3)})
+                print("  ".join([name.ljust(20), "n=" + str(n), "seed=" + str(seed), "weight=" + str(weight),
+                                 str(round(seconds, 4)) + "s", str(round(peak, 2)) + "MiB"]))
+
+                if exact:
+                    if optimum is None:
+                        optimum = (name, weight)
+                    elif weight != optimum[1]:
+                        raise AssertionError(name + " found " + str(weight) + " but " + optimum[0] + " found "
+                                             + str(optimum[1]) + " (n=" + str(n) + ", seed=" + str(seed) + ")")
+    return records
+
+def save_results(records, path):
+    "Writes the records and the machine they ran on as JSON"
+    with open(path, 'w') as f:
+        json.dump({
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'machine': platform.platform(),
+            'cpus': os.cpu_count(),
+            'results': records,
+        }, f, indent=1)
+
+def find_regressions(records, baseline_path, threshold=1.25, min_seconds=0.01):
+    """
+        Compares records against a file written by save_results. A run regresses
+        when it took more than threshold times its baseline and longer than
+        min_seconds, so timer noise on tiny runs is ignored.
+    """
+    with open(baseline_path) as f:
+        baseline = {(r['solver'], r['n'], r['seed']): r for r in json.load(f)['results']}
+
+    regressions = []
+    for r in records:
+        old = baseline.get((r['solver'], r['n'], r['seed']))
+        if old is not None and r['seconds'] > max(old['seconds'] * threshold, min_seconds):
+            regressions.append((r, old))
+    return regressions
+
+def benchmark_parallel(sizes=(16, 18, 20), processes=None, weight_limit=1000, seed=0):
+    """
+        Compares held_karp_parallel against the single-process held_karp_layered
+        for each size and each process count 1, 2, 4, ... up to the core count.
+    """
+    cores = os.cpu_count() or 1
+    counts = sorted({p for p in (1, 2, 4, 8, 16, 32, 64) if p <= cores} | {cores})
+    if processes is not None:
+        counts = [processes]
+
+    for n in sizes:
+        random.seed(seed)
+        G = generate_tsp_test_case(n, weight_limit)
+        (_, expected), serial = time_call(held_karp_layered, G, 0)
+        print("n = " + str(n) + ": single process " + str(round(serial, 3)) + "s")
+
+        for p in counts:
+            (_, weight), elapsed = time_call(held_karp_parallel, G, 0, processes=p)
+            if weight != expected:
+                raise AssertionError("parallel solver returned " + str(weight) + ", expected " + str(expected))
+            print("    " + str(p) + " processes: " + str(round(elapsed, 3)) + "s, speedup "
+                  + str(round(serial / elapsed, 2)) + "x, efficiency "
+                  + str(round(serial / elapsed / p, 2)))
+
+def benchmark_batch(sizes=(8, 10, 12), count=2000, loop_count=20, weight_limit=1000):
+    """
+        Instances per second of held_karp_batch on count instances against a
+        Python loop of tsp_solver over the first loop_count of them.
+    """
+    for n in sizes:
+        stack = np.stack([random_instance(n, weight_limit, seed=seed).matrix for seed in range(count)])
+        (weights, _), batched = time_call(held_karp_batch, stack)
+        graphs = [DistanceMatrix(D).to_networkx() for D in stack[:loop_count]]
+        looped, looped_time = time_call(lambda: [tsp_solver(G, 0) for G in graphs])
+        if list(weights[:loop_count]) != looped:
+            raise AssertionError("held_karp_batch disagrees with tsp_solver for n = " + str(n))
+        batch_rate, loop_rate = count / batched, loop_count / looped_time
+        print("n = " + str(n) + ": batch " + str(round(batch_rate)) + " instances/s, loop "
+              + str(round(loop_rate, 1)) + " instances/s, " + str(round(batch_rate / loop_rate)) + "x")
+
+def benchmark_restricted(n=1000, widths=(2, 4, 6, 8, 10), passes=2, seed=0):
+    """
+        Runtime and tour quality of restricted_tsp_solver for each width on n
+        random points, starting from the nearest neighbor tour. Quality is the
+        gap above the 1-tree lower bound.
+    """
+    points = np.random.default_rng(seed).random((n, 2)) * 1000
+    metric = EuclideanMetric(points)
+    lower = one_tree_bound(metric)
+    order = metric.nearest_neighbor_tour(0)
+    start = tour_weight(order + order[:1], metric)
+    print("n = " + str(n) + ": nearest neighbor " + str(round(start, 1)) + ", gap "
+          + str(round(100 * (start / lower - 1), 2)) + "%")
+    for width in widths:
+        (_, weight), elapsed = time_call(restricted_tsp_solver, points, 0, width, passes)
+        print("    width " + str(width) + ": " + str(round(elapsed, 3)) + "s, weight " + str(round(weight, 1))
+              + ", gap " + str(round(100 * (weight / lower - 1), 2)) + "%")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="TSP solver benchmarks")
+    commands = parser.add_subparsers(dest='command')
+
+    suite = commands.add_parser('suite', help="time every solver over sizes and seeds")
+    suite.add_argument('--sizes', type=int, nargs='+', default=[8, 10, 12, 14, 16, 18])
+    suite.add_argument('--seeds', type=int, nargs='+', default=[0, 1, 2])
+    suite.add_argument('--solvers', nargs='+', choices=list(SOLVERS), default=None)
+    suite.add_argument('--output', help="write the results to this JSON file")
+    suite.add_argument('--baseline', help="JSON file from an earlier run to compare against")
+    suite.add_argument('--threshold', type=float, default=1.25,
+                       help="slowdown factor over the baseline that counts as a regression")
+    suite.add_argument('--fail-on-regression', action='store_true',
+                       help="exit with status 1 when any run regresses")
+
+    parallel = commands.add_parser('parallel', help="compare the multi-process Held-Karp against one process")
+    parallel.add_argument('sizes', type=int, nargs='*', default=[16, 18, 20])
+    parallel.add_argument('--processes', type=int, default=None)
+
+    batch = commands.add_parser('batch', help="instances per second of the batched solver against a loop")
+    batch.add_argument('sizes', type=int, nargs='*', default=[8, 10, 12])
+    batch.add_argument('--count', type=int, default=2000)
+
+    restricted = commands.add_parser('restricted', help="runtime and tour quality of the restricted DP per width")
+    restricted.add_argument('widths', type=int, nargs='*', default=[2, 4, 6, 8, 10])
+    restricted.add_argument('--n', type=int, default=1000)
+    restricted.add_argument('--passes', type=int, default=2)
+
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or argv[0] not in ('suite', 'parallel', 'batch', 'restricted', '-h', '--help'):
+        argv = ['suite'] + argv
+    args = parser.parse_args(argv)
+    if args.command == 'parallel':
+        benchmark_parallel(args.sizes, args.processes)
+        return 0
+    if args.command == 'batch':
+        benchmark_batch(args.sizes, args.count)
+        return 0
+    if args.command == 'restricted':
+        benchmark_restricted(args.n, args.widths, args.passes)
+        return 0
+
+    records = run_suite(args.sizes, args.seeds, args.solvers)
+    if args.output:
+        save_results(records, args.output)
+        print("Results saved to " + args.output)
+    if args.baseline:
+        regressions = find_regressions(records, args.baseline, args.threshold)
+        for r, old in regressions:
+            print("REGRESSION " + r['solver'] + " n=" + str(r['n']) + " seed=" + str(r['seed']) + ": "
+                  + str(old['seconds']) + "s -> " + str(r['seconds']) + "s")
+        if regressions and args.fail_on_regression:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+import math
+import numpy as np
+from instances import distance_matrix
+from held_karp import _as_weight
+
+def minimum_spanning_tree(C):
+    """
+        Prim's algorithm on a dense cost matrix, or anything that hands out its
+        float rows as C[v]: each row is read once. Returns (weight, degree of
+        every vertex).
+    """
+    k = len(C)
+    degree = np.zeros(k, dtype=np.int64)
+    if k < 2:
+        return 0.0, degree
+
+    in_tree = np.zeros(k, dtype=bool)
+    in_tree[0] = True
+    best = C[0].copy()
+    link = np.zeros(k, dtype=np.int64)
+    weight = 0.0
+    for _ in range(k - 1):
+        best[in_tree] = np.inf
+        v = int(best.argmin())
+        weight += best[v]
+        degree[v] += 1
+        degree[link[v]] += 1
+        in_tree[v] = True
+        row = C[v]
+        closer = row < best
+        best[closer] = row[closer]
+        link[closer] = v
+    return weight, degree
+
+def one_tree(C):
+    """
+        Minimum 1-tree with vertex 0 as the special vertex: a spanning tree on
+        the other vertices plus the two cheapest edges at vertex 0.
+        Returns (weight, degree of every vertex).
+    """
+    weight, degree = minimum_spanning_tree(C[1:, 1:])
+    a, b = np.argsort(C[0, 1:])[:2] + 1
+    degree = np.concatenate(([2], degree))
+    degree[a] += 1
+    degree[b] += 1
+    return weight + C[0, a] + C[0, b], degree
+
+def held_karp_bound(D, upper_bound, iterations=300):
+    """
+        Held-Karp 1-tree bound by subgradient ascent on vertex penalties pi.
+        Every tour costs at least the 1-tree weight under D[i][j] + pi[i] + pi[j]
+        minus 2 * sum(pi). Returns (bound, pi).
+    """
+    n = len(D)
+    pi = np.zeros(n)
+    best_bound, best_pi = -np.inf, pi
+    step, stale = 2.0, 0
+    for _ in range(iterations):
+        weight, degree = one_tree(D + pi[:, None] + pi[None, :])
+        bound = weight - 2 * pi.sum()
+        if bound > best_bound + 1e-9:
+            best_bound, best_pi, stale = bound, pi.copy(), 0
+        else:
+            stale += 1
+            if stale >= 10:
+                step, stale = step / 2, 0
+
+        slack = degree - 2
+        norm = (slack ** 2).sum()
+        if norm == 0 or step < 1e-6 or best_bound >= upper_bound - 1e-9:
+            # a 1-tree with every degree 2 is an optimal tour
+            break
+        pi = pi + step * (upper_bound - bound) / norm * slack
+
+    return best_bound, best_pi
+
+def tour_weight(tour, D):
+    return sum(D[u, v] for u, v in zip(tour, tour[1:]))
+
+def two_opt(tour, D):
+    "Applies improving 2-opt moves to a closed tour (tour[0] == tour[-1]) until none is left"
+    tour = list(tour)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, len(tour) - 2):
+            for j in range(i + 1, len(tour) - 1):
+                a, b, c, d = tour[i - 1], tour[i], tour[j], tour[j + 1]
+                if D[a, c] + D[b, d] < D[a, b] + D[c, d] - 1e-9:
+                    tour[i:j + 1] = tour[i:j + 1][::-1]
+                    improved = True
+    return tour
+
+def or_opt(tour, D):
+    "Moves segments of 1-3 vertices, either way round, to cheaper places until no move helps"
+    tour = list(tour[:-1])
+    n = len(tour)
+    improved = True
+    while improved:
+        improved = False
+        for length in (1, 2, 3):
+            for i in range(1, n - length + 1):
+                segment = tour[i:i + length]
+                rest = tour[:i] + tour[i + length:]
+                p, q = tour[i - 1], tour[(i + length) % n]
+                saved = D[p, segment[0]] + D[segment[-1], q] - D[p, q]
+                for k in range(len(rest)):
+                    a, b = rest[k], rest[(k + 1) % len(rest)]
+                    for s in (segment, segment[::-1]):
+                        if a != p and D[a, s[0]] + D[s[-1], b] - D[a, b] < saved - 1e-9:
+                            tour = rest[:k + 1] + s + rest[k + 1:]
+                            improved = True
+                            break
+                    if improved:
+                        break
+                if improved:
+                    break
+            if improved:
+                break
+        start = tour.index(0)
+        tour = tour[start:] + tour[:start]
+    return tour + [0]
+
+def nearest_neighbor_tour(C, first):
+    "Greedy tour from first that always moves to the cheapest unvisited vertex, rotated to start at 0"
+    tour = [first]
+    visited = np.zeros(len(C), dtype=bool)
+    visited[first] = True
+    for _ in range(len(C) - 1):
+        row = np.where(visited, np.inf, C[tour[-1]])
+        tour.append(int(row.argmin()))
+        visited[tour[-1]] = True
+    start = tour.index(0)
+    return tour[start:] + tour[:start] + [0]
+
+def initial_tour(D, C=None):
+    """
+        Best local optimum over nearest neighbor tours from every vertex, each
+        improved by 2-opt and Or-opt on D. The greedy steps follow C when given,
+        typically D under Held-Karp penalties, which steers them along the 1-tree.
+    """
+    C = D if C is None else C
+    best = None
+    for first in range(len(D)):
+        tour = nearest_neighbor_tour(C, first)
+        weight = None
+        while weight is None or tour_weight(tour, D) < weight:
+            weight = tour_weight(tour, D)
+            tour = or_opt(two_opt(tour, D), D)
+        if best is None or weight < tour_weight(best, D):
+            best = tour
+    return best
+
+def branch_and_bound(G, start_vertex=0):
+    """
+        Exact TSP by depth-first branch and bound over partial tours from the start.
+        The incumbent comes from nearest neighbor + 2-opt + Or-opt. A partial tour
+        start -> ... -> last is pruned when its cost plus a spanning tree bound on
+        the path still needed (last -> remaining vertices -> start) cannot beat it.
+        The spanning tree runs on weights penalized by the root's Held-Karp
+        subgradient ascent, which makes the bound much tighter than a plain MST.
+        Needs symmetric weights. Returns (tour, weight) like traveling_salesman_brute_force.
+    """
+    nodes, D = distance_matrix(G, start_vertex)
+    n = len(nodes)
+    if not np.array_equal(D, D.T):
+        raise ValueError("branch_and_bound needs symmetric edge weights")
+    if n <= 3:
+        tour = list(range(n)) + [0]
+        return [nodes[v] for v in tour], _as_weight(tour_weight(tour, D), D)
+
+    integral = np.all(D == np.floor(D))
+    tour = nearest_neighbor_tour(D, 0)
+    root_bound, pi = held_karp_bound(D, tour_weight(tour, D))
+    C = D + pi[:, None] + pi[None, :]
+
+    best_tour = initial_tour(D, C)
+    best = [tour_weight(best_tour, D), best_tour]
+
+    def prune_at(bound):
+        # with integral weights any tour strictly below the incumbent costs at most best - 1
+        if integral:
+            bound = math.ceil(bound - 1e-6)
+        return bound >= best[0] - 1e-9
+
+    # the bound runs once per search node on small sets, where plain lists beat numpy
+    Cl, pil = C.tolist(), pi.tolist()
+
+    def lower_bound(cost, last, remaining):
+        # the path still needed is an edge out of last, a spanning path of remaining
+        # and an edge into 0, so it costs at least the cheapest such edges plus an MST
+        weight = min(Cl[last][v] for v in remaining) + min(Cl[0][v] for v in remaining)
+        row = Cl[remaining[0]]
+        best_link = {v: row[v] for v in remaining[1:]}
+        while best_link:
+            v = min(best_link, key=best_link.get)
+            weight += best_link.pop(v)
+            row = Cl[v]
+            for u in best_link:
+                if row[u] < best_link[u]:
+                    best_link[u] = row[u]
+        return cost + weight - 2 * sum(pil[v] for v in remaining) - pil[last] - pil[0]
+
+    def search(path, cost, remaining):
+        last = path[-1]
+        if len(remaining) == 1:
+            v = remaining[0]
+            total = cost + D[last, v] + D[v, 0]
+            if total < best[0]:
+                best[0], best[1] = total, path + [v, 0]
+            return
+
+        children = []
+        for v in remaining:
+            rest = [u for u in remaining if u != v]
+            child_cost = cost + D[last, v]
+            bound = lower_bound(child_cost, v, rest)
+            if not prune_at(bound):
+                children.append((bound, v, child_cost, rest))
+
+        children.sort(key=lambda child: child[0])
+        for bound, v, child_cost, rest in children:
+            # the incumbent may have improved while searching earlier siblings
+            if not prune_at(bound):
+                search(path + [v], child_cost, rest)
+
+    if not prune_at(root_bound):
+        search([0], 0.0, list(range(1, n)))
+
+    return [nodes[v] for v in best[1]], _as_weight(best[0], D)
@@ -0,0 +1,269 @@
+import numpy as np
+from instances import distance_matrix
+
+class InfeasibleTourError(ValueError):
+    "The graph has no Hamiltonian cycle, so there is no tour to return"
+
+def subset_layers(m):
+    """
+        Orders the 2^m bitmasks over m elements by population count.
+        Returns (order, bounds): layer k is order[bounds[k]:bounds[k + 1]].
+    """
+    masks = np.arange(1 << m, dtype=np.int64)
+    popcount = np.zeros(1 << m, dtype=np.int8)
+    for j in range(m):
+        popcount += (masks >> j) & 1
+
+    order = np.argsort(popcount, kind='stable').astype(np.int32)
+    bounds = np.zeros(m + 2, dtype=np.int64)
+    np.cumsum(np.bincount(popcount, minlength=m + 1), out=bounds[1:])
+    return order, bounds
+
+def layer_ranks(order, bounds):
+    "rank[S] is the row of bitmask S inside its own layer"
+    rank = np.empty(len(order), dtype=np.int32)
+    for k in range(len(bounds) - 1):
+        rank[order[bounds[k]:bounds[k + 1]]] = np.arange(bounds[k + 1] - bounds[k])
+    return rank
+
+def relax_layer(masks, rank, prev, W, out, parent):
+    """
+        Fills out[r][j] with the cheapest path over masks[r] ending at j, reading
+        the previous layer's table prev (rows ordered by rank). parent[r][j] gets
+        the vertex visited just before j.
+    """
+    out.fill(np.inf)
+    for j in range(W.shape[0]):
+        rows = np.flatnonzero((masks >> j) & 1)
+        cand = prev[rank[masks[rows] ^ (1 << j)]]
+        cand += W[:, j]
+        best = cand.argmin(axis=1)
+        out[rows, j] = cand[np.arange(len(rows)), best]
+        parent[rows, j] = best
+
+def _as_weight(x, D):
+    "Converts a numpy scalar to a python number, int when every weight is integral"
+    if np.all(D == np.floor(D)):
+        return int(x)
+    return float(x)
+
+def held_karp_bitmask(G, start_vertex=0):
+    """
+        Bellman-Held-Karp on a flat 2^(n-1) x (n-1) numpy table indexed by bitmask.
+        dp[S][j] is the cheapest path that leaves the start, visits exactly the
+        vertices in S and ends at j. Each subset layer is relaxed in one
+        vectorized batch per end vertex. Returns the same weight as tsp_solver.
+    """
+    nodes, D = distance_matrix(G, start_vertex)
+    n = len(nodes)
+    if n == 1:
+        return 0
+    if n == 2:
+        return _as_weight(D[0, 1] + D[1, 0], D)
+
+    m = n - 1
+    W = D[1:, 1:]
+    dp = np.full((1 << m, m), np.inf)
+    dp[1 << np.arange(m), np.arange(m)] = D[0, 1:]
+
+    order, bounds = subset_layers(m)
+    for k in range(2, m + 1):
+        layer = order[bounds[k]:bounds[k + 1]]
+        for j in range(m):
+            S = layer[(layer >> j) & 1 == 1]
+            # dp[S - j][t] is inf for every t outside S - j, so the min skips them
+            dp[S, j] = (dp[S ^ (1 << j)] + W[:, j]).min(axis=1)
+
+    return _as_weight((dp[-1] + D[1:, 0]).min(), D)
+
+def held_karp_layered(G, start_vertex=0):
+    """
+        Held-Karp that keeps only the previous and current subset layers of costs.
+        Predecessors are kept for every state as one uint8 each, so the optimal
+        tour can be walked back at the end. Returns (tour, weight) like
+        traveling_salesman_brute_force.
+    """
+    nodes, D = distance_matrix(G, start_vertex)
+    n = len(nodes)
+    if n == 1:
+        return [start_vertex, start_vertex], 0
+    if n == 2:
+        return nodes + [start_vertex], _as_weight(D[0, 1] + D[1, 0], D)
+    if n > 256:
+        raise ValueError("uint8 predecessors limit held_karp_layered to 256 nodes")
+
+    m = n - 1
+    W = D[1:, 1:]
+    order, bounds = subset_layers(m)
+    rank = layer_ranks(order, bounds)
+    # parent[p][j] belongs to the mask at order[p]; 255 marks the start vertex
+    parent = np.full((1 << m, m), 255, dtype=np.uint8)
+
+    # layer 1 is ordered 1, 2, 4, ... so row j holds the mask {j}
+    prev = np.full((m, m), np.inf)
+    prev[np.arange(m), np.arange(m)] = D[0, 1:]
+    for k in range(2, m + 1):
+        masks = order[bounds[k]:bounds[k + 1]]
+        cur = np.empty((len(masks), m))
+        relax_layer(masks, rank, prev, W, cur, parent[bounds[k]:bounds[k + 1]])
+        prev = cur
+
+    return _walk_back(nodes, D, order, bounds, rank, parent, prev[0])
+
+def _walk_back(nodes, D, order, bounds, rank, parent, last_layer):
+    "Closes the tour from the full-set costs and follows the predecessors back to the start"
+    m = len(nodes) - 1
+    closing = last_layer + D[1:, 0]
+    j = int(closing.argmin())
+    weight = _as_weight(closing[j], D)
+
+    path = []
+    S = (1 << m) - 1
+    for k in range(m, 0, -1):
+        path.append(nodes[j + 1])
+        t = int(parent[bounds[k] + rank[S], j])
+        S ^= 1 << j
+        j = t
+
+    return [nodes[0]] + path[::-1] + [nodes[0]], weight
+
+def held_karp_batch(D, chunk_size=None):
+    """
+        Solves a stack of same-size instances at once: D has shape (B, n, n) with
+        vertex 0 as every tour's start. The Held-Karp table carries the batch as
+        its last axis, so each layer step is one numpy operation over all
+        instances. Returns (weights, tours): weights has shape (B,) and tours
+        (B, n + 1) holds vertex indices from 0 back to 0.
+    """
+    D = np.asarray(D, dtype=np.float64)
+    B, n = D.shape[0], D.shape[1]
+    if n < 2:
+        return np.zeros(B), np.zeros((B, 2), dtype=np.int64)
+    if n > 256:
+        raise ValueError("uint8 predecessors limit held_karp_batch to 256 nodes")
+
+    m = n - 1
+    if chunk_size is None:
+        # keep the cost table of one chunk around 64 MiB
+        chunk_size = max(1, (64 << 20) // (8 * (1 << m) * m))
+    order, bounds = subset_layers(m)
+
+    weights = np.empty(B)
+    tours = np.zeros((B, n + 1), dtype=np.int64)
+    for lo in range(0, B, chunk_size):
+        hi = min(lo + chunk_size, B)
+        weights[lo:hi], tours[lo:hi] = _batch_chunk(D[lo:hi], order, bounds)
+    return weights, tours
+
+def _batch_chunk(D, order, bounds):
+    b, n = D.shape[0], D.shape[1]
+    m = n - 1
+    # W[t][j] holds the weights t -> j of every instance in the chunk
+    W = np.ascontiguousarray(D[:, 1:, 1:].transpose(1, 2, 0))
+    dp = np.full((1 << m, m, b), np.inf)
+    parent = np.zeros((1 << m, m, b), dtype=np.uint8)
+    dp[1 << np.arange(m), np.arange(m)] = D[:, 0, 1:].T
+
+    for k in range(2, m + 1):
+        layer = order[bounds[k]:bounds[k + 1]]
+        for j in range(m):
+            S = layer[(layer >> j) & 1 == 1]
+            cand = dp[S ^ (1 << j)]
+            cand += W[:, j]
+            best = cand.argmin(axis=1)
+            parent[S, j] = best
+            dp[S, j] = np.take_along_axis(cand, best[:, None, :], axis=1)[:, 0]
+
+    closing = dp[-1] + D[:, 1:, 0].T
+    j = closing.argmin(axis=0)
+    batch = np.arange(b)
+    weights = closing[j, batch]
+
+    tours = np.zeros((b, n + 1), dtype=np.int64)
+    S = np.full(b, (1 << m) - 1, dtype=np.int64)
+    for step in range(m, 0, -1):
+        tours[:, step] = j + 1
+        t = parent[S, j, batch].astype(np.int64)
+        S ^= 1 << j
+        j = t
+    return weights, tours
+
+def held_karp_sparse(G, start_vertex=0):
+    """
+        Held-Karp for sparse and directed graphs. Missing edges are absent rather
+        than expensive (np.inf in a DistanceMatrix), and only reachable states
+        are stored: each layer is an array of (subset, end) keys grown from the
+        previous layer along out-neighbor bitsets. A state is dropped as soon as
+        some unvisited vertex has lost every possible way in or out. Returns
+        (tour, weight), or raises InfeasibleTourError when there is no tour.
+    """
+    nodes, D = distance_matrix(G, start_vertex, missing=np.inf)
+    n = len(nodes)
+    np.fill_diagonal(D, np.inf)
+    if n == 1:
+        return [start_vertex, start_vertex], 0
+    if n > 63:
+        raise ValueError("int64 subset bitsets limit held_karp_sparse to 63 nodes")
+
+    m = n - 1
+    W = D[1:, 1:]
+    bit = 1 << np.arange(m, dtype=np.int64)
+    edge = np.isfinite(D)
+    # out_bits[t] / in_bits[v]: vertices reachable from t / reaching v, over non-start vertices
+    out_bits = (edge[1:, 1:] * bit[None, :]).sum(axis=1)
+    in_bits = (edge[1:, 1:] * bit[:, None]).sum(axis=0)
+    from_start, to_start = edge[0, 1:], edge[1:, 0]
+    full = (1 << m) - 1
+
+    # a layer holds states (subset S, end J) sorted by S then J, with their costs and predecessors
+    J = np.flatnonzero(from_start)
+    S, cost = bit[J], D[0, 1:][J]
+    layers = [(S, J, np.full(len(J), 255, dtype=np.uint8))]
+    for k in range(2, m + 1):
+        if len(S) == 0:
+            break
+        new_S, new_J, new_cost, new_parent = [], [], [], []
+        for j in range(m):
+            ok = (out_bits[J] >> j) & 1 & ~(S >> j) & 1 == 1
+            new_S.append(S[ok] | bit[j])
+            new_J.append(np.full(int(ok.sum()), j, dtype=np.int64))
+            new_cost.append(cost[ok] + W[J[ok], j])
+            new_parent.append(J[ok])
+        S, J = np.concatenate(new_S), np.concatenate(new_J)
+        cost, parent = np.concatenate(new_cost), np.concatenate(new_parent)
+
+        # keep the cheapest way into every state
+        first = np.lexsort((cost, J, S))
+        S, J, cost, parent = S[first], J[first], cost[first], parent[first]
+        unique = np.ones(len(S), dtype=bool)
+        unique[1:] = (S[1:] != S[:-1]) | (J[1:] != J[:-1])
+        S, J, cost, parent = S[unique], J[unique], cost[unique], parent[unique]
+
+        # drop states that strand an unvisited vertex
+        unvisited = full & ~S
+        alive = np.ones(len(S), dtype=bool)
+        for v in range(m):
+            open_v = (unvisited >> v) & 1 == 1
+            can_enter = in_bits[v] & (unvisited | bit[J]) != 0
+            can_leave = (out_bits[v] & unvisited != 0) | to_start[v]
+            alive &= ~open_v | (can_enter & can_leave)
+        if k == m:
+            alive &= to_start[J]
+        S, J, cost, parent = S[alive], J[alive], cost[alive], parent[alive].astype(np.uint8)
+        layers.append((S, J, parent))
+
+    closing = cost + D[1:, 0][J]
+    best = int(closing.argmin()) if len(S) else None
+    if best is None or not np.isfinite(closing[best]):
+        raise InfeasibleTourError("No tour visits every node of the graph exactly once")
+
+    path = []
+    subset, j = int(S[best]), int(J[best])
+    for k in range(m, 0, -1):
+        path.append(nodes[j + 1])
+        layer_S, layer_J, layer_parent = layers[k - 1]
+        lo, hi = np.searchsorted(layer_S, subset), np.searchsorted(layer_S, subset, side="right")
+        t = int(layer_parent[lo + np.searchsorted(layer_J[lo:hi], j)])
+        subset, j = subset ^ (1 << j), t
+
+    return [nodes[0]] + path[::-1] + [nodes[0]], _as_weight(closing[best], D[np.isfinite(D)])
@@ -0,0 +1,104 @@
+import os
+import numpy as np
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+from instances import distance_matrix
+from held_karp import subset_layers, layer_ranks, relax_layer, _walk_back
+
+# numpy views onto the shared blocks, set up once per worker by _attach
+_shared = {}
+
+def _attach(names, m, max_layer):
+    "Pool initializer: maps the parent's shared memory blocks into this worker"
+    blocks = {key: SharedMemory(name=name) for key, name in names.items()}
+    _shared['blocks'] = blocks
+    _shared.update(_views(blocks, m, max_layer))
+
+def _views(blocks, m, max_layer):
+    return {
+        'W': np.ndarray((m, m), dtype=np.float64, buffer=blocks['W'].buf),
+        'order': np.ndarray((1 << m,), dtype=np.int32, buffer=blocks['order'].buf),
+        'rank': np.ndarray((1 << m,), dtype=np.int32, buffer=blocks['rank'].buf),
+        'parent': np.ndarray((1 << m, m), dtype=np.uint8, buffer=blocks['parent'].buf),
+        'layers': [np.ndarray((max_layer, m), dtype=np.float64, buffer=blocks[key].buf)
+                   for key in ('layer0', 'layer1')],
+    }
+
+def _relax_chunk(base, lo, hi, prev_len, src):
+    """
+        Relaxes rows lo..hi of the layer starting at order[base], reading the
+        previous layer from shared slot src and writing into the other slot.
+    """
+    masks = _shared['order'][base + lo:base + hi]
+    prev = _shared['layers'][src][:prev_len]
+    out = _shared['layers'][1 - src][lo:hi]
+    relax_layer(masks, _shared['rank'], prev, _shared['W'], out,
+                _shared['parent'][base + lo:base + hi])
+
+def _allocate(arrays):
+    "Copies each array into a new shared memory block; None reserves an empty block of that size"
+    blocks = {}
+    for key, (size, data) in arrays.items():
+        blocks[key] = SharedMemory(create=True, size=max(size, 1))
+        if data is not None:
+            np.ndarray(data.shape, dtype=data.dtype, buffer=blocks[key].buf)[...] = data
+    return blocks
+
+def held_karp_parallel(G, start_vertex=0, processes=None, chunks_per_process=4):
+    """
+        Layered Held-Karp with each subset layer split across a process pool.
+        The distance matrix, mask order, both cost layers and the predecessors
+        live in shared memory, so workers only receive row ranges. Returns
+        (tour, weight) like held_karp_layered.
+    """
+    nodes, D = distance_matrix(G, start_vertex)
+    n = len(nodes)
+    if n <= 3:
+        from held_karp import held_karp_layered
+        return held_karp_layered(G, start_vertex)
+    if n > 256:
+        raise ValueError("uint8 predecessors limit held_karp_parallel to 256 nodes")
+
+    processes = processes or os.cpu_count() or 1
+    m = n - 1
+    order, bounds = subset_layers(m)
+    rank = layer_ranks(order, bounds)
+    max_layer = int(np.diff(bounds).max())
+
+    blocks = _allocate({
+        'W': (D[1:, 1:].nbytes, np.ascontiguousarray(D[1:, 1:])),
+        'order': (order.nbytes, order),
+        'rank': (rank.nbytes, rank),
+        'parent': ((1 << m) * m, None),
+        'layer0': (max_layer * m * 8, None),
+        'layer1': (max_layer * m * 8, None),
+    })
+    del order, rank
+    views = _views(blocks, m, max_layer)
+    first = None
+    try:
+        views['parent'].fill(255)
+        # layer 1 is ordered 1, 2, 4, ... so row j holds the mask {j}
+        first = views['layers'][0][:m]
+        first.fill(np.inf)
+        first[np.arange(m), np.arange(m)] = D[0, 1:]
+
+        names = {key: block.name for key, block in blocks.items()}
+        src = 0
+        with Pool(processes, initializer=_attach, initargs=(names, m, max_layer)) as pool:
+            for k in range(2, m + 1):
+                base, size = int(bounds[k]), int(bounds[k + 1] - bounds[k])
+                pieces = max(1, min(processes * chunks_per_process, size // 256))
+                cuts = np.linspace(0, size, pieces + 1).astype(int)
+                pool.starmap(_relax_chunk, [(base, int(lo), int(hi), int(bounds[k] - bounds[k - 1]), src)
+                                            for lo, hi in zip(cuts, cuts[1:])])
+                src = 1 - src
+
+        return _walk_back(nodes, D, views['order'], bounds, views['rank'],
+                          views['parent'], views['layers'][src][0])
+    finally:
+        # views must be dropped before the blocks can be closed
+        views = first = None
+        for block in blocks.values():
+            block.close()
+            block.unlink()
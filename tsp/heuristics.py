@@ -0,0 +1,386 @@
+import math
+import random
+import time
+from collections import deque, namedtuple
+import numpy as np
+from instances import DistanceMatrix, BLOCK_ROWS, distance_matrix
+from branch_and_bound import minimum_spanning_tree, nearest_neighbor_tour, tour_weight
+
+HeuristicResult = namedtuple("HeuristicResult", ["tour", "weight", "lower_bound", "gap"])
+
+class MatrixMetric():
+    "Distances read from a dense (n, n) matrix, which may be memory-mapped"
+
+    def __init__(self, D):
+        self.D = D
+        self.n = len(self.D)
+
+    def dist(self, i, j):
+        return self.D[i, j].item()
+
+    def __getitem__(self, edge):
+        return self.dist(*edge)
+
+    def row(self, i):
+        return self.D[i]
+
+    def candidates(self, k):
+        "The k nearest other vertices of every vertex, nearest first"
+        k = min(k, self.n - 1)
+        lists = []
+        for lo in range(0, self.n, BLOCK_ROWS):
+            block = self.D[lo:lo + BLOCK_ROWS].astype(np.float64)
+            block[np.arange(len(block)), np.arange(lo, lo + len(block))] = np.inf
+            near = np.argpartition(block, k - 1, axis=1)[:, :k]
+            near = np.take_along_axis(near, np.take_along_axis(block, near, axis=1).argsort(axis=1), axis=1)
+            lists.extend(near.tolist())
+        return lists
+
+    def nearest_neighbor_tour(self, first):
+        return nearest_neighbor_tour(self.D, first)[:-1]
+
+class EuclideanMetric():
+    """
+        Straight-line distances between (n, 2) points. Nearest neighbor queries go
+        through a uniform grid, so nothing is quadratic in the number of points.
+    """
+
+    def __init__(self, points):
+        points = np.asarray(points, dtype=np.float64)
+        self.n = len(points)
+        self.x, self.y = points[:, 0], points[:, 1]
+        self.xs, self.ys = self.x.tolist(), self.y.tolist()
+
+        # about two points per cell
+        width = max(np.ptp(self.x), np.ptp(self.y), 1e-9)
+        self.side = max(1, int(math.sqrt(self.n / 2)))
+        self.cell = width / self.side * (1 + 1e-9)
+        self.cx = ((self.x - self.x.min()) / self.cell).astype(int).tolist()
+        self.cy = ((self.y - self.y.min()) / self.cell).astype(int).tolist()
+
+    def dist(self, i, j):
+        return math.hypot(self.xs[i] - self.xs[j], self.ys[i] - self.ys[j])
+
+    def __getitem__(self, edge):
+        return self.dist(*edge)
+
+    def row(self, i):
+        return np.hypot(self.x - self.xs[i], self.y - self.ys[i])
+
+    def _grid(self):
+        grid = {}
+        for v in range(self.n):
+            grid.setdefault((self.cx[v], self.cy[v]), set()).add(v)
+        return grid
+
+    def _ring(self, v, r):
+        "Grid cells at Chebyshev distance r from the cell of v"
+        cx, cy = self.cx[v], self.cy[v]
+        if r == 0:
+            yield (cx, cy)
+            return
+        for d in range(-r, r + 1):
+            yield (cx + d, cy - r)
+            yield (cx + d, cy + r)
+        for d in range(-r + 1, r):
+            yield (cx - r, cy + d)
+            yield (cx + r, cy + d)
+
+    def _nearest(self, v, grid, k):
+        "The k nearest vertices to v found in grid, nearest first"
+        found = []
+        r = 0
+        while r <= self.side + 1:
+            for cell in self._ring(v, r):
+                for u in grid.get(cell, ()):
+                    if u != v:
+                        found.append((self.dist(v, u), u))
+            # anything outside rings 0..r is at least r cells away
+            if len(found) >= k:
+                found.sort()
+                if found[k - 1][0] <= r * self.cell:
+                    break
+            r += 1
+        found.sort()
+        return [u for _, u in found[:k]]
+
+    def candidates(self, k):
+        grid = self._grid()
+        return [self._nearest(v, grid, min(k, self.n - 1)) for v in range(self.n)]
+
+    def nearest_neighbor_tour(self, first):
+        grid = self._grid()
+        tour = [first]
+        grid[(self.cx[first], self.cy[first])].discard(first)
+        for _ in range(self.n - 1):
+            v = self._nearest(tour[-1], grid, 1)[0]
+            grid[(self.cx[v], self.cy[v])].discard(v)
+            tour.append(v)
+        return tour
+
+class ArrayTour():
+    """
+        Tour as an array of vertices plus the position of every vertex. A 2-opt
+        move reverses whichever side of the cycle is shorter.
+    """
+
+    def __init__(self, order):
+        self.order = list(order)
+        self.n = len(self.order)
+        self.pos = [0] * self.n
+        for i, v in enumerate(self.order):
+            self.pos[v] = i
+
+    def succ(self, v):
+        return self.order[(self.pos[v] + 1) % self.n]
+
+    def pred(self, v):
+        return self.order[self.pos[v] - 1]
+
+    def reverse(self, a, b):
+        "Reverses the path that runs forward from vertex a to vertex b"
+        i, j = self.pos[a], self.pos[b]
+        length = (j - i) % self.n + 1
+        if 2 * length > self.n:
+            i, j = (j + 1) % self.n, (i - 1) % self.n
+            length = self.n - length
+        order, pos = self.order, self.pos
+        for _ in range(length // 2):
+            order[i], order[j] = order[j], order[i]
+            pos[order[i]] = i
+            pos[order[j]] = j
+            i = i + 1 if i + 1 < self.n else 0
+            j = j - 1 if j > 0 else self.n - 1
+
+    def exchange(self, a, b, c, d):
+        "Replaces tour edges (a, b) and (c, d) by (a, c) and (b, d)"
+        if self.succ(a) == b:
+            self.reverse(b, c)
+        else:
+            self.reverse(a, d)
+
+def _two_opt_step(t, metric, cand, a):
+    """
+        Tries 2-opt moves that add an edge from a to a candidate.
+        Returns (touched vertices, gain) for the move made, or None.
+    """
+    dist = metric.dist
+    for forward in (True, False):
+        b = t.succ(a) if forward else t.pred(a)
+        d_ab = dist(a, b)
+        for c in cand[a]:
+            d_ac = dist(a, c)
+            if d_ac >= d_ab:
+                break
+            d = t.succ(c) if forward else t.pred(c)
+            if c == b or d == a:
+                continue
+            gain = d_ab + dist(c, d) - d_ac - dist(b, d)
+            if gain > 1e-9:
+                if forward:
+                    t.exchange(a, b, c, d)
+                else:
+                    t.exchange(b, a, d, c)
+                return (a, b, c, d), gain
+    return None
+
+def _or_opt_step(t, metric, cand, a):
+    """
+        Tries to move the segment of 1-3 vertices starting at a, either way round,
+        next to a candidate of one of its ends. Returns (touched vertices, gain) or None.
+    """
+    dist = metric.dist
+    if t.n < 8:
+        return None
+    for length in (1, 2, 3):
+        s1 = a
+        s2 = t.order[(t.pos[a] + length - 1) % t.n]
+        segment = {t.order[(t.pos[a] + i) % t.n] for i in range(length)}
+        p, q = t.pred(s1), t.succ(s2)
+        saved = dist(p, s1) + dist(s2, q) - dist(p, q)
+        if saved <= 1e-9:
+            continue
+        for end in (s1, s2):
+            for c in cand[end]:
+                if dist(end, c) >= saved:
+                    break
+                if c in segment:
+                    continue
+                for x, y in ((c, t.succ(c)), (t.pred(c), c)):
+                    if x == p or y == p or x in segment or y in segment:
+                        continue
+                    reversed_cost = dist(x, s2) + dist(s1, y)
+                    same_cost = dist(x, s1) + dist(s2, y)
+                    gain = saved - min(reversed_cost, same_cost) + dist(x, y)
+                    if gain > 1e-9:
+                        # three 2-opt moves: p s1..s2 q ... x y  ->  p q ... x s1..s2 y
+                        t.exchange(p, s1, x, y)
+                        if x != q:
+                            t.exchange(p, x, q, s2)
+                        if same_cost < reversed_cost:
+                            t.exchange(x, s2, s1, y)
+                        return (p, q, s1, s2, x, y), gain
+    return None
+
+def local_search(t, metric, cand, queue, deadline):
+    """
+        2-opt and Or-opt over candidate lists with don't-look bits: only vertices
+        in queue are examined, and a vertex is queued again only when one of its
+        tour edges changes. Returns the total gain of the moves made, stopping
+        early at the deadline.
+    """
+    queued = [False] * t.n
+    for v in queue:
+        queued[v] = True
+    steps = 0
+    total = 0.0
+    while queue:
+        steps += 1
+        if steps % 256 == 0 and time.perf_counter() > deadline:
+            break
+        a = queue.popleft()
+        queued[a] = False
+        move = _two_opt_step(t, metric, cand, a) or _or_opt_step(t, metric, cand, a)
+        if move:
+            touched, gain = move
+            total += gain
+            for v in touched:
+                if not queued[v]:
+                    queued[v] = True
+                    queue.append(v)
+    return total
+
+def _double_bridge(t, metric, rng, window=50):
+    """
+        Swaps two adjacent short segments at a random place in the tour.
+        Returns (weight change, vertices whose edges changed).
+    """
+    i = rng.randrange(0, t.n - window)
+    j, k, l = sorted(rng.sample(range(i + 1, i + window), 3))
+    order = t.order
+    before = (metric.dist(order[i], order[i + 1]) + metric.dist(order[j], order[j + 1])
+              + metric.dist(order[k], order[k + 1]) + metric.dist(order[l], order[l + 1]))
+    order[i + 1:l + 1] = order[k + 1:l + 1] + order[j + 1:k + 1] + order[i + 1:j + 1]
+    for p in range(i + 1, l + 1):
+        t.pos[order[p]] = p
+    after = (metric.dist(order[i], order[i + 1]) + metric.dist(order[l - k + i], order[l - k + i + 1])
+             + metric.dist(order[l - j + i], order[l - j + i + 1]) + metric.dist(order[l], order[l + 1]))
+    return after - before, order[i:l + 2]
+
+class _Rows():
+    "The distance rows of every vertex but 0, made one at a time as minimum_spanning_tree asks for them"
+
+    def __init__(self, metric):
+        self.metric = metric
+
+    def __len__(self):
+        return self.metric.n - 1
+
+    def __getitem__(self, v):
+        return self.metric.row(v + 1)[1:].astype(np.float64)
+
+def one_tree_bound(metric):
+    """
+        Weight of a minimum 1-tree: a spanning tree on vertices 1..n-1 plus the two
+        cheapest edges at vertex 0. Prim's algorithm asks the metric for one row
+        of distances at a time, so it needs O(n) memory.
+    """
+    weight, _ = minimum_spanning_tree(_Rows(metric))
+    return weight + np.sort(metric.row(0)[1:])[:2].sum().item()
+
+def one_tree_seconds(metric, samples=16):
+    "Estimated time of one_tree_bound, from the first steps of the same Prim's algorithm"
+    rows = _Rows(metric)
+    steps = min(samples, len(rows) - 1)
+    if steps < 1:
+        return 0.0
+    start = time.perf_counter()
+    best = rows[0]
+    in_tree = np.zeros(len(rows), dtype=bool)
+    link = np.zeros(len(rows), dtype=np.int64)
+    for _ in range(steps):
+        best[in_tree] = np.inf
+        v = int(best.argmin())
+        in_tree[v] = True
+        row = rows[v]
+        closer = row < best
+        best[closer] = row[closer]
+        link[closer] = v
+    return (time.perf_counter() - start) * len(rows) / steps
+
+def two_neighbor_bound(metric, cand):
+    "Every vertex has two tour edges, each at least as long as its nearest candidates"
+    return sum(metric.dist(v, near[0]) + metric.dist(v, near[1]) for v, near in enumerate(cand)) / 2
+
+def heuristic_solver(metric, start=0, time_budget=10.0, neighbors=10, bound_limit=10000, seed=0):
+    """
+        Nearest neighbor construction followed by 2-opt and Or-opt restricted to
+        candidate neighbor lists. Leftover time goes to iterated local search:
+        a random local double bridge, repaired by the same local search and kept
+        if the tour got shorter. Returns HeuristicResult with the tour as vertex
+        indices from start back to start, its weight, a lower bound (the 1-tree
+        when n <= bound_limit, otherwise the two nearest neighbors bound) and
+        the gap weight / lower_bound - 1. Building the candidate lists and the
+        1-tree count against time_budget: the search stops early enough to
+        leave time for the 1-tree, which is skipped if it would take more than
+        half of the time left.
+    """
+    began = time.perf_counter()
+    deadline = began + time_budget
+    n = metric.n
+    if n <= 3:
+        tour = list(range(n))
+        weight = tour_weight(tour + tour[:1], metric)
+        return HeuristicResult(tour + [tour[0]], weight, weight, 0.0)
+
+    cand = metric.candidates(neighbors)
+    tree = n <= bound_limit
+    if tree:
+        # the sampled steps tend to run faster than the whole tree, so leave a margin
+        seconds = 1.5 * one_tree_seconds(metric)
+        tree = seconds < (deadline - time.perf_counter()) / 2
+        if tree:
+            deadline -= seconds
+
+    t = ArrayTour(metric.nearest_neighbor_tour(start))
+    local_search(t, metric, cand, deque(t.order), deadline)
+    weight = tour_weight(t.order + t.order[:1], metric)
+
+    rng = random.Random(seed)
+    best_order, best_pos = t.order[:], t.pos[:]
+    while n > 60 and time.perf_counter() < deadline:
+        change, touched = _double_bridge(t, metric, rng)
+        change -= local_search(t, metric, cand, deque(touched), deadline)
+        if change < -1e-9:
+            weight += change
+            best_order, best_pos = t.order[:], t.pos[:]
+        else:
+            t.order, t.pos = best_order[:], best_pos[:]
+
+    # recount so rounding in the tracked gains does not leak into the result
+    i = best_order.index(start)
+    tour = best_order[i:] + best_order[:i] + [start]
+    weight = tour_weight(tour, metric)
+
+    lower = two_neighbor_bound(metric, cand)
+    if tree:
+        lower = max(lower, one_tree_bound(metric))
+    lower = float(lower)
+    return HeuristicResult(tour, weight, lower, weight / lower - 1 if lower > 0 else 0.0)
+
+def heuristic_tsp(G, start_vertex=0, time_budget=10.0, neighbors=10):
+    """
+        heuristic_solver on a networkx graph or a DistanceMatrix, whose (possibly
+        memory-mapped) array is used in place. The tour uses the instance's node labels.
+    """
+    if isinstance(G, DistanceMatrix):
+        nodes, metric, start = G.nodes, MatrixMetric(G.matrix), G.nodes.index(start_vertex)
+    else:
+        nodes, D = distance_matrix(G, start_vertex)
+        metric, start = MatrixMetric(D), 0
+    result = heuristic_solver(metric, start, time_budget, neighbors)
+    return result._replace(tour=[nodes[v] for v in result.tour])
+
+def heuristic_tsp_points(points, start_vertex=0, time_budget=10.0, neighbors=10):
+    "heuristic_solver on (n, 2) coordinates under the Euclidean distance"
+    return heuristic_solver(EuclideanMetric(points), start_vertex, time_budget, neighbors)
@@ -0,0 +1,188 @@
+import numpy as np
+from instances import DistanceMatrix, distance_matrix
+from held_karp import subset_layers, _as_weight
+
+class IncrementalHeldKarp():
+    """
+        Held-Karp solver that keeps its full 2^(n-1) x (n-1) table of costs and
+        uint8 predecessors between calls. update() changes a few edge weights and
+        recomputes only the entries whose minimum can change: those with a
+        changed edge into their end vertex, and those below an entry that
+        changed. Finding them still means looking at every subset that holds a
+        changed edge, 2^(n-3) per directed edge, plus every extension of an
+        entry that changed. Once that passes rebuild times the table size,
+        update() rebuilds the table instead, so an update costs at most about
+        a full build plus that fraction of one.
+    """
+
+    def __init__(self, instance, start_vertex=0, rebuild=0.25):
+        self.nodes, self.D = distance_matrix(instance, start_vertex)
+        self.index = {v: i for i, v in enumerate(self.nodes)}
+        if isinstance(instance, DistanceMatrix):
+            self.directed = not instance.is_symmetric()
+        else:
+            self.directed = instance.is_directed()
+
+        n = len(self.nodes)
+        if n < 3:
+            raise ValueError("IncrementalHeldKarp needs at least 3 nodes")
+        if n > 256:
+            raise ValueError("uint8 predecessors limit IncrementalHeldKarp to 256 nodes")
+        self.m = m = n - 1
+        self.rebuild = rebuild
+        self.order, self.bounds = subset_layers(m)
+        # subsets of the m - 2 vertices other than a changed edge's ends, by size
+        self.rest_order, self.rest_bounds = subset_layers(m - 2)
+        self.recomputed = 0
+        self._build()
+
+    def _build(self):
+        m, W = self.m, self.D[1:, 1:]
+        self.dp = np.full((1 << m, m), np.inf)
+        self.parent = np.full((1 << m, m), 255, dtype=np.uint8)
+        self.dp[1 << np.arange(m), np.arange(m)] = self.D[0, 1:]
+        for k in range(2, m + 1):
+            layer = self.order[self.bounds[k]:self.bounds[k + 1]]
+            for j in range(m):
+                S = layer[(layer >> j) & 1 == 1]
+                self._relax(S, np.full(len(S), j))
+        self.recomputed = self.dp.size
+
+    def _relax(self, S, J):
+        "Recomputes dp[S[i]][J[i]] from scratch. Returns the old values"
+        cand = self.dp[S ^ (1 << J)] + self.D[1:, 1:][:, J].T
+        best = cand.argmin(axis=1)
+        old = self.dp[S, J]
+        self.dp[S, J] = cand[np.arange(len(S)), best]
+        self.parent[S, J] = best
+        self.recomputed += len(S)
+        return old
+
+    def solve(self):
+        "Returns (tour, weight) for the current weights"
+        m = self.m
+        closing = self.dp[-1] + self.D[1:, 0]
+        j = int(closing.argmin())
+        if not np.isfinite(closing[j]):
+            raise ValueError("Could not find cheapest tour")
+        path = []
+        S = (1 << m) - 1
+        while S:
+            path.append(self.nodes[j + 1])
+            t = int(self.parent[S, j])
+            S ^= 1 << j
+            j = t
+        return [self.nodes[0]] + path[::-1] + [self.nodes[0]], _as_weight(closing.min(), self.D)
+
+    def update(self, changes):
+        """
+            Applies {(u, v): weight} and returns the new (tour, weight). On an
+            undirected instance each change applies to both directions.
+            self.recomputed counts the table entries this update touched,
+            the whole table when it fell back to a rebuild.
+        """
+        m = self.m
+        self.recomputed = 0
+        # (t, j, increased) per changed edge between non-start vertices, in DP coordinates
+        edges = []
+        for (u, v), w in changes.items():
+            pairs = [(self.index[u], self.index[v])]
+            if not self.directed:
+                pairs.append(pairs[0][::-1])
+            for a, b in pairs:
+                old = self.D[a, b]
+                if old == w:
+                    continue
+                self.D[a, b] = w
+                if a == 0 and b != 0:
+                    # a first leg: only the single-vertex entry changes directly
+                    edges.append((None, b - 1, w > old))
+                elif a != 0 and b != 0:
+                    edges.append((a - 1, b - 1, w > old))
+
+        # looking at an entry on the incremental path costs about as much as
+        # computing one in _build, so once the entries looked at pass a
+        # fraction of the table, finishing with a full rebuild is cheaper
+        budget = self.rebuild * self.dp.size
+        examined = sum(1 << (m - 2) for t, _, _ in edges if t is not None)
+        if examined > budget:
+            self._build()
+            return self.solve()
+
+        changed = self._first_layer(edges)
+        for k in range(2, m + 1):
+            S, J, looked = self._affected(k, edges, changed)
+            examined += looked + len(S)
+            if examined > budget:
+                self._build()
+                return self.solve()
+            if len(S) == 0:
+                changed = (S, J, np.zeros(0, dtype=bool))
+                continue
+            old = self._relax(S, J)
+            new = self.dp[S, J]
+            moved = new != old
+            changed = (S[moved], J[moved], new[moved] > old[moved])
+        return self.solve()
+
+    def _first_layer(self, edges):
+        S, J, up = [], [], []
+        for t, j, increased in edges:
+            if t is None:
+                old = self.dp[1 << j, j]
+                self.dp[1 << j, j] = self.D[0, j + 1]
+                S.append(1 << j)
+                J.append(j)
+                up.append(self.dp[1 << j, j] > old)
+        self.recomputed += len(S)
+        return np.array(S, dtype=np.int64), np.array(J, dtype=np.int64), np.array(up, dtype=bool)
+
+    def _containing(self, k, t, j):
+        "The k-vertex subsets that hold both t and j, built from the (k - 2)-subsets of the other vertices"
+        rest = self.rest_order[self.rest_bounds[k - 2]:self.rest_bounds[k - 1]].astype(np.int64)
+        lo, hi = min(t, j), max(t, j)
+        # spread the bits of rest apart to leave holes at lo and hi
+        low = rest & ((1 << lo) - 1)
+        mid = (rest >> lo) & ((1 << (hi - lo - 1)) - 1)
+        high = rest >> (hi - 1)
+        return low | (mid << (lo + 1)) | (high << (hi + 1)) | (1 << lo) | (1 << hi)
+
+    def _affected(self, k, edges, changed):
+        """
+            Entries of layer k whose minimum may move: a candidate t -> j got
+            cheaper than the entry, or the candidate it currently uses got
+            dearer. Only the subsets holding a changed edge and the extensions
+            of entries changed in layer k - 1 are looked at. Returns unique
+            (S, J) arrays and the number of extensions looked at.
+        """
+        m = self.m
+        W = self.D[1:, 1:]
+        S_parts, J_parts = [], []
+
+        for t, j, increased in edges:
+            if t is None:
+                continue
+            S = self._containing(k, t, j)
+            if increased:
+                S = S[self.parent[S, j] == t]
+            else:
+                S = S[self.dp[S ^ (1 << j), t] + W[t, j] < self.dp[S, j]]
+            S_parts.append(S)
+            J_parts.append(np.full(len(S), j, dtype=np.int64))
+
+        prev_S, prev_T, prev_up = changed
+        if len(prev_S):
+            # every extension of a changed entry (prev, t) by a vertex j outside prev
+            j = np.arange(m)
+            outside = (prev_S[:, None] >> j[None, :]) & 1 == 0
+            rows, J = np.nonzero(outside)
+            P, T, up = prev_S[rows], prev_T[rows], prev_up[rows]
+            S = P | (1 << J)
+            keep = np.where(up, self.parent[S, J] == T, self.dp[P, T] + W[T, J] < self.dp[S, J])
+            S_parts.append(S[keep])
+            J_parts.append(J[keep])
+
+        if not S_parts:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), len(prev_S)
+        keys = np.unique(np.concatenate(S_parts) * m + np.concatenate(J_parts))
+        return keys // m, keys % m, len(prev_S) * (m - k + 1)
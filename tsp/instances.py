@@ -0,0 +1,235 @@
+import math
+import numpy as np
+
+# same penalty tsp_solver uses for a missing edge, so every engine agrees
+MISSING_EDGE_WEIGHT = 374374374
+
+# rows of a distance matrix computed or copied per step when filling it block by block
+BLOCK_ROWS = 256
+
+class DistanceMatrix():
+    """
+        A TSP instance as a dense, typed (n, n) array: matrix[a][b] is the weight of
+        the edge nodes[a] -> nodes[b]. The array may be a numpy memmap, in which
+        case rows are paged in from disk as the solvers touch them. coords keeps
+        the (n, 2) points of geometric instances.
+    """
+
+    def __init__(self, matrix, nodes=None, coords=None):
+        if matrix.ndim != 2 or matrix.shape[0] != matrix.shape[1]:
+            raise ValueError("A distance matrix must be square, got shape " + str(matrix.shape))
+        self.matrix = matrix
+        self.nodes = list(range(len(matrix))) if nodes is None else list(nodes)
+        self.coords = coords
+
+    def __len__(self):
+        return len(self.matrix)
+
+    def number_of_nodes(self):
+        return len(self.matrix)
+
+    def weight(self, u, v):
+        return self.matrix[self.nodes.index(u), self.nodes.index(v)].item()
+
+    def is_symmetric(self):
+        for lo in range(0, len(self), BLOCK_ROWS):
+            if not np.array_equal(self.matrix[lo:lo + BLOCK_ROWS], self.matrix[:, lo:lo + BLOCK_ROWS].T):
+                return False
+        return True
+
+    def to_networkx(self):
+        "A complete networkx graph with the same weights, for the solvers that need one"
+        import networkx as nx
+        G = nx.Graph() if self.is_symmetric() else nx.DiGraph()
+        G.add_nodes_from(self.nodes)
+        for a, u in enumerate(self.nodes):
+            row = self.matrix[a].tolist()
+            for b, v in enumerate(self.nodes):
+                if a != b:
+                    G.add_edge(u, v, weight=row[b])
+        return G
+
+    def save(self, path):
+        "Writes the matrix to a .npy file that load() can memory-map"
+        np.save(path, self.matrix)
+
+    @staticmethod
+    def load(path, mmap=True, nodes=None, coords=None):
+        return DistanceMatrix(np.load(path, mmap_mode='r' if mmap else None), nodes, coords)
+
+def _output(n, dtype, path):
+    "A fresh (n, n) array, memory-mapped to a new .npy file when path is given"
+    if path is None:
+        return np.empty((n, n), dtype=dtype)
+    return np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=(n, n))
+
+def from_networkx(G, dtype=np.float64, path=None, missing=MISSING_EDGE_WEIGHT):
+    """
+        DistanceMatrix for a networkx graph. Undirected edges fill both directions,
+        missing edges get MISSING_EDGE_WEIGHT like tsp_solver unless missing says
+        otherwise (np.inf marks them as absent for the sparse solver).
+    """
+    nodes = list(G.nodes)
+    index = {v: i for i, v in enumerate(nodes)}
+    D = _output(len(nodes), dtype, path)
+    D[...] = missing
+    np.fill_diagonal(D, 0)
+    for u, v, w in G.edges(data='weight'):
+        D[index[u], index[v]] = w
+        if not G.is_directed():
+            D[index[v], index[u]] = w
+    return DistanceMatrix(D, nodes)
+
+def distance_matrix(instance, start_vertex, missing=MISSING_EDGE_WEIGHT):
+    """
+        Returns (nodes, D) for a networkx graph or DistanceMatrix: nodes lists the
+        nodes with start_vertex first and D is the float64 matrix in that order.
+        missing is the weight given to edges a networkx graph does not have.
+    """
+    if not isinstance(instance, DistanceMatrix):
+        instance = from_networkx(instance, missing=missing)
+    start = instance.nodes.index(start_vertex)
+    perm = [start] + [i for i in range(len(instance)) if i != start]
+    D = np.asarray(instance.matrix[np.ix_(perm, perm)], dtype=np.float64)
+    return [instance.nodes[i] for i in perm], D
+
+def random_instance(num_nodes, weight_limit, seed=None, dtype=np.int32, path=None):
+    "Symmetric random integer weights in 1..weight_limit, like generate_tsp_test_case without networkx"
+    rng = np.random.default_rng(seed)
+    D = _output(num_nodes, dtype, path)
+    for lo in range(0, num_nodes, BLOCK_ROWS):
+        D[lo:lo + BLOCK_ROWS] = rng.integers(1, weight_limit + 1, size=(min(BLOCK_ROWS, num_nodes - lo), num_nodes))
+    # mirror the upper triangle, block by block so memmaps never load whole
+    for lo in range(0, num_nodes, BLOCK_ROWS):
+        hi = min(lo + BLOCK_ROWS, num_nodes)
+        block = D[lo:hi]
+        upper = np.triu(np.ones((hi - lo, num_nodes), dtype=bool), k=lo + 1)
+        block[~upper] = D[:, lo:hi].T[~upper]
+        np.fill_diagonal(block[:, lo:hi], 0)
+    return DistanceMatrix(D)
+
+def _euc_2d(x, y, xs, ys):
+    return np.floor(np.hypot(x - xs, y - ys) + 0.5)
+
+def _ceil_2d(x, y, xs, ys):
+    return np.ceil(np.hypot(x - xs, y - ys))
+
+def _man_2d(x, y, xs, ys):
+    return np.floor(np.abs(x - xs) + np.abs(y - ys) + 0.5)
+
+def _max_2d(x, y, xs, ys):
+    return np.maximum(np.floor(np.abs(x - xs) + 0.5), np.floor(np.abs(y - ys) + 0.5))
+
+def _att(x, y, xs, ys):
+    r = np.sqrt(((x - xs) ** 2 + (y - ys) ** 2) / 10)
+    t = np.floor(r + 0.5)
+    return np.where(t < r, t + 1, t)
+
+def _geo_radians(v):
+    degrees = np.trunc(v)
+    return math.pi * (degrees + 5 * (v - degrees) / 3) / 180
+
+def _geo(x, y, xs, ys):
+    lat_i, lon_i, lat_j, lon_j = _geo_radians(x), _geo_radians(y), _geo_radians(xs), _geo_radians(ys)
+    q1 = np.cos(lon_i - lon_j)
+    q2 = np.cos(lat_i - lat_j)
+    q3 = np.cos(lat_i + lat_j)
+    return np.floor(6378.388 * np.arccos(np.clip(0.5 * ((1 + q1) * q2 - (1 - q1) * q3), -1, 1)) + 1)
+
+def _exact(x, y, xs, ys):
+    return np.hypot(x - xs, y - ys)
+
+# TSPLIB EDGE_WEIGHT_TYPE -> vectorized distance from one point to many
+METRICS = {
+    'EUC_2D': _euc_2d,
+    'CEIL_2D': _ceil_2d,
+    'MAN_2D': _man_2d,
+    'MAX_2D': _max_2d,
+    'ATT': _att,
+    'GEO': _geo,
+    'EXACT_2D': _exact,
+}
+
+def from_coords(coords, metric='EXACT_2D', dtype=np.float64, path=None):
+    "DistanceMatrix of (n, 2) points under one of METRICS, filled block by block"
+    coords = np.asarray(coords, dtype=np.float64)
+    n = len(coords)
+    distance = METRICS[metric]
+    x, y = coords[:, 0], coords[:, 1]
+    D = _output(n, dtype, path)
+    for lo in range(0, n, BLOCK_ROWS):
+        hi = min(lo + BLOCK_ROWS, n)
+        block = distance(x[lo:hi, None], y[lo:hi, None], x[None, :], y[None, :])
+        block[np.arange(hi - lo), np.arange(lo, hi)] = 0
+        D[lo:hi] = block
+    return DistanceMatrix(D, coords=coords)
+
+def euclidean_instance(num_nodes, seed=None, scale=1000.0, dtype=np.float64, path=None):
+    "Uniform random points in a scale x scale square with straight-line distances"
+    coords = np.random.default_rng(seed).random((num_nodes, 2)) * scale
+    return from_coords(coords, 'EXACT_2D', dtype, path)
+
+def _explicit(values, n, fmt, D):
+    "Fills D from the numbers of an EDGE_WEIGHT_SECTION in the given EDGE_WEIGHT_FORMAT"
+    if fmt == 'FULL_MATRIX':
+        D[...] = values.reshape(n, n)
+        return
+
+    pos = 0
+    lower = fmt.startswith('LOWER')
+    diagonal = 'DIAG' in fmt
+    if fmt.endswith('_COL'):
+        # a column-wise lower triangle reads like a row-wise upper triangle and vice versa
+        lower = not lower
+    for i in range(n):
+        if lower:
+            cols = range(0, i + 1) if diagonal else range(0, i)
+        else:
+            cols = range(i, n) if diagonal else range(i + 1, n)
+        row = values[pos:pos + len(cols)]
+        pos += len(cols)
+        D[i, cols.start:cols.stop] = row
+        D[cols.start:cols.stop, i] = row
+    np.fill_diagonal(D, 0)
+
+def read_tsplib(path, dtype=np.int32, out=None):
+    """
+        Reads a TSPLIB .tsp / .atsp file into a DistanceMatrix. Coordinate types
+        listed in METRICS are expanded block by block, explicit weights in any
+        EDGE_WEIGHT_FORMAT. With out set, the matrix is written to that .npy file
+        and memory-mapped instead of held in RAM.
+    """
+    spec = {}
+    sections = {}
+    with open(path) as f:
+        lines = [line.strip() for line in f]
+
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        i += 1
+        if line.endswith('_SECTION') or line.endswith('_SECTION:'):
+            # a section runs until the next keyword line
+            values = []
+            while i < len(lines) and not lines[i][:1].isalpha():
+                values.extend(lines[i].split())
+                i += 1
+            sections[line.rstrip(':').strip()] = np.array(values, dtype=np.float64)
+        elif line.startswith('EOF'):
+            break
+        elif ':' in line:
+            key, value = line.split(':', 1)
+            spec[key.strip()] = value.strip()
+
+    n = int(spec['DIMENSION'])
+    coords = None
+    if 'NODE_COORD_SECTION' in sections:
+        coords = sections['NODE_COORD_SECTION'].reshape(n, 3)[:, 1:3]
+    kind = spec.get('EDGE_WEIGHT_TYPE', 'EUC_2D')
+    if kind == 'EXPLICIT':
+        D = _output(n, dtype, out)
+        _explicit(sections['EDGE_WEIGHT_SECTION'], n, spec.get('EDGE_WEIGHT_FORMAT', 'FULL_MATRIX'), D)
+        return DistanceMatrix(D, coords=coords)
+    if kind not in METRICS:
+        raise ValueError("Unsupported TSPLIB EDGE_WEIGHT_TYPE: " + kind)
+    return from_coords(coords, kind, dtype, out)
@@ -0,0 +1,127 @@
+import numpy as np
+from instances import DistanceMatrix, distance_matrix
+from branch_and_bound import tour_weight
+from heuristics import MatrixMetric, EuclideanMetric
+
+def balas_simonetti(order, metric, width):
+    """
+        Best tour among the reorderings of order (a tour without the closing
+        vertex, order[0] fixed first) in which the vertex at position i still
+        comes before the vertex at position j whenever j >= i + width.
+        Dynamic programming over (u, T, l): u is the first position not yet
+        visited, T the set of visited positions among u + 1 .. u + width - 1
+        and l the position visited last, so the table holds
+        O(n * width * 2^width) states instead of 2^n. Returns (order, weight).
+    """
+    n = len(order)
+    k = max(2, min(width, n))
+    half = 1 << (k - 1)
+    T_all = np.arange(half)
+    offsets = np.arange(k - 1)
+    # placing position u itself also skips the visited run right after it
+    shift = np.array([(bin(T)[2:][::-1] + '0').index('0') + 1 for T in range(half)])
+    # T grouped by popcount, so each group only feeds the groups after it
+    layers = []
+    for p in range(k):
+        Ts = T_all[[bin(T).count('1') == p for T in range(half)]]
+        layers.append((Ts, [(int(s), np.flatnonzero(shift[Ts] == s)) for s in np.unique(shift[Ts])]))
+
+    # the last visited position l is stored as l - u + k
+    dp = {1: np.full((half, 2 * k), np.inf)}
+    dp[1][0, k - 1] = 0.0
+    parent = {1: np.full((half, 2 * k), -1, dtype=np.int16)}
+
+    for u in range(1, n):
+        cur = dp.pop(u)
+        par = parent[u]
+        # W[l][o]: from position u - k + l to position u + o
+        W = np.full((2 * k, k), np.inf)
+        for li in range(2 * k):
+            pl = u - k + li
+            if 0 <= pl < n:
+                for o in range(min(k, n - u)):
+                    W[li, o] = metric.dist(order[pl], order[u + o])
+
+        for Ts, runs in layers:
+            # every way to step from the last position to a position u + o
+            vals = cur[Ts][:, :, None] + W
+            best_l = vals.argmin(axis=1)
+            best = np.take_along_axis(vals, best_l[:, None, :], axis=1)[:, 0]
+
+            # visit a position ahead of u: T grows, u stays
+            rows, o = np.nonzero(((Ts[:, None] >> offsets) & 1 == 0) & (offsets < n - u - 1))
+            o += 1
+            dst, col = Ts[rows] | (1 << (o - 1)), o + k
+            better = best[rows, o] < cur[dst, col]
+            cur[dst[better], col[better]] = best[rows, o][better]
+            par[dst[better], col[better]] = best_l[rows, o][better]
+
+            # visit u itself: move on to the next unvisited position
+            for s, group in runs:
+                nxt = u + s
+                if nxt not in dp:
+                    dp[nxt] = np.full((half, 2 * k), np.inf)
+                    parent[nxt] = np.full((half, 2 * k), -1, dtype=np.int16)
+                dst = Ts[group] >> s
+                better = best[group, 0] < dp[nxt][dst, k - s]
+                dp[nxt][dst[better], k - s] = best[group, 0][better]
+                parent[nxt][dst[better], k - s] = best_l[group, 0][better]
+
+    final = dp[n][0].copy()
+    for li in range(2 * k):
+        pl = n - k + li
+        final[li] += metric.dist(order[pl], order[0]) if 0 <= pl < n else np.inf
+    li = int(final.argmin())
+    weight = final[li]
+
+    positions = []
+    u, T = n, 0
+    while True:
+        pl = u - k + li
+        positions.append(pl)
+        if pl == 0:
+            break
+        prev = int(parent[u][T, li])
+        if pl > u:
+            T &= ~(1 << (pl - u - 1))
+        else:
+            s = u - pl
+            T = (T << s) | ((1 << (s - 1)) - 1)
+            u = pl
+        li = prev
+
+    return [order[p] for p in reversed(positions)], weight
+
+def restricted_tsp_solver(instance, start_vertex=0, width=8, passes=2, tour=None):
+    """
+        Polishes a tour with the restricted dynamic program of balas_simonetti.
+        width trades quality for speed: the table grows like n * width * 2^width.
+        Each further pass rotates the tour by half its length, so vertices near
+        the fixed first position get to move too. instance is a networkx graph,
+        a DistanceMatrix or (n, 2) Euclidean points; tour defaults to a nearest
+        neighbor tour. Returns (tour, weight).
+    """
+    if isinstance(instance, DistanceMatrix):
+        nodes, metric = instance.nodes, MatrixMetric(instance.matrix)
+        start = nodes.index(start_vertex)
+    elif isinstance(instance, np.ndarray):
+        nodes, metric, start = None, EuclideanMetric(instance), start_vertex
+    else:
+        nodes, D = distance_matrix(instance, start_vertex)
+        metric, start = MatrixMetric(D), 0
+
+    if tour is None:
+        order = metric.nearest_neighbor_tour(start)
+    else:
+        label = {v: i for i, v in enumerate(nodes)} if nodes is not None else None
+        order = [label[v] for v in tour[:-1]] if label is not None else list(tour[:-1])
+
+    for _ in range(passes):
+        order, _ = balas_simonetti(order, metric, width)
+        order = order[len(order) // 2:] + order[:len(order) // 2]
+
+    i = order.index(start)
+    order = order[i:] + order[:i]
+    order.append(order[0])
+    weight = tour_weight(order, metric)
+    return ([nodes[v] for v in order] if nodes is not None else order), weight
@@ -1,8 +1,9 @@
 import random
 import networkx as nx
-import time
+import os
 from itertools import permutations
 from itertools import combinations
+from multiprocessing import Pool, Value
 
 def generate_tsp_test_case(num_nodes, weight_limit):
     "Generate a complete graph with random weights"
@@ -36,11 +37,130 @@ def traveling_salesman_brute_force(G, start_node = 0):
 
     return cheapest_tour, cheapest_tour_weight
 
+# search state of one worker of traveling_salesman_parallel_brute_force, set by _init_shard_worker
+_shard = {}
+
+def _init_shard_worker(weights, best):
+    _shard['weights'] = weights
+    _shard['best'] = best
+    n = len(weights)
+    # neighbors cheapest first, so good tours turn up early and tighten pruning
+    _shard['order'] = [sorted((v for v in range(n) if v != u), key=lambda v: weights[u][v]) for u in range(n)]
+    _shard['min_out'] = [min(weights[u][v] for v in range(n) if v != u) for u in range(n)]
+
+def _search_shard(prefix):
+    """
+        Exhaustive search over the tours that start with prefix (prefix[0] is the
+        start). Partial costs are carried down the recursion, and a branch is cut
+        once its cost plus the cheapest way out of every vertex still to leave
+        reaches the best tour any worker has found. Returns (weight, tour) of
+        the best tour found here, or None.
+    """
+    W, order, min_out, shared = _shard['weights'], _shard['order'], _shard['min_out'], _shard['best']
+    n = len(W)
+    start = prefix[0]
+    visited = [False] * n
+    for v in prefix:
+        visited[v] = True
+    cost = sum(W[u][v] for u, v in zip(prefix, prefix[1:]))
+    # every unvisited vertex and the last one still has to be left once
+    slack = sum(min_out[v] for v in range(n) if not visited[v]) + min_out[prefix[-1]]
+
+    state = {'best': shared.value, 'found': None, 'steps': 0}
+    path = list(prefix)
+
+    def extend(last, cost, slack, depth):
+        state['steps'] += 1
+        if state['steps'] & 4095 == 0 and shared.value < state['best']:
+            state['best'] = shared.value
+        if depth == n:
+            total = cost + W[last][start]
+            if total < state['best']:
+                state['best'] = total
+                state['found'] = (total, path + [start])
+                with shared.get_lock():
+                    if total < shared.value:
+                        shared.value = total
+            return
+        slack -= min_out[last]
+        for v in order[last]:
+            if visited[v]:
+                continue
+            c = cost + W[last][v]
+            if c + slack >= state['best']:
+                # order[last] is sorted, so later neighbors cost even more
+                break
+            visited[v] = True
+            path.append(v)
+            extend(v, c, slack, depth + 1)
+            path.pop()
+            visited[v] = False
+
+    if cost + slack < state['best']:
+        extend(prefix[-1], cost, slack, len(prefix))
+    return state['found']
+
+def traveling_salesman_parallel_brute_force(G, start_node=0, processes=None, prefix_length=3):
+    """
+        Exact TSP by exhaustive search, sharded over a process pool by the first
+        prefix_length - 1 vertices after the start. The best weight found so far
+        is shared between workers, and partial tours are abandoned as soon as
+        they cannot beat it. Returns the same (tour, weight) as
+        traveling_salesman_brute_force.
+    """
+    nodes = [start_node] + [v for v in G.nodes if v != start_node]
+    n = len(nodes)
+    weights = [[G[u][v]['weight'] if G.has_edge(u, v) else float('inf') for v in nodes] for u in nodes]
+    if n <= prefix_length:
+        return traveling_salesman_brute_force(G, start_node)
+
+    # seed the shared bound with a nearest neighbor tour; ties keep the search exact
+    tour = [0]
+    while len(tour) < n:
+        tour.append(min((v for v in range(n) if v not in tour), key=lambda v: weights[tour[-1]][v]))
+    best = Value('d', sum(weights[u][v] for u, v in zip(tour, tour[1:] + [0])) + 1)
+
+    shards = [(0,) + p for p in permutations(range(1, n), prefix_length - 1)]
+    shards.sort(key=lambda p: sum(weights[u][v] for u, v in zip(p, p[1:])))
+
+    found = []
+    with Pool(processes or os.cpu_count(), initializer=_init_shard_worker, initargs=(weights, best)) as pool:
+        for result in pool.imap_unordered(_search_shard, shards):
+            if result is not None:
+                found.append(result)
+
+    if not found:
+        raise ValueError("Could not find cheapest tour")
+    weight, tour = min(found)
+    return [nodes[v] for v in tour], weight
+
 def subsets_of_size_k(element_set, k):
     return map(frozenset, combinations(element_set, k))
 
-def tsp_solver(G, start_vertex):
-    """ Bellman-Karp-Held algorithm. Run-time = O(n^2 * 2^n), much faster than O(n!) by brute force """
+def tsp_solver(G, start_vertex, mode="sets"):
+    """
+        Bellman-Karp-Held algorithm. Run-time = O(n^2 * 2^n), much faster than O(n!) by brute force.
+        mode="sets" keys the table on frozensets. The numpy engines are mode="bitmask" (held_karp.py),
+        mode="layered", its memory-bounded variant (use held_karp_layered directly for the tour),
+        mode="parallel", which splits every layer across a process pool (held_karp_parallel.py), and
+        mode="sparse", which only expands reachable states of sparse or directed graphs and raises
+        InfeasibleTourError instead of pricing missing edges at 374374374.
+    """
+    if mode == "bitmask":
+        from held_karp import held_karp_bitmask
+        return held_karp_bitmask(G, start_vertex)
+    if mode == "layered":
+        from held_karp import held_karp_layered
+        return held_karp_layered(G, start_vertex)[1]
+    if mode == "sparse":
+        from held_karp import held_karp_sparse
+        return held_karp_sparse(G, start_vertex)[1]
+    if mode == "parallel":
+        from held_karp_parallel import held_karp_parallel
+        return held_karp_parallel(G, start_vertex)[1]
+    if mode != "sets":
+        raise ValueError("Unknown tsp_solver mode: " + str(mode))
+
     n = G.number_of_nodes()
     nodes = set(G.nodes)
     nodes.remove(start_vertex)
@@ -80,18 +200,9 @@ def tsp_solver(G, start_vertex):
     return ans
 
 def main():
-    G = generate_tsp_test_case(num_nodes=11, weight_limit=1000)
-    start_bf = time.time()
-    _, cheapest_tour_weight = traveling_salesman_brute_force(G, start_node=0)
-    end_bf = time.time()
-    print("Answer by brute force:", cheapest_tour_weight)
-    print("Brute force time:", str(round(end_bf - start_bf, 3))+"s")
-
-    start_dp = time.time()
-    ans = tsp_solver(G, start_vertex=0)
-    end_dp = time.time()
-    print("Answer by DP:", ans)
-    print("DP time:", str(round(end_dp - start_dp, 3))+"s")
+    "Quick sweep of every solver; see benchmark.py for sizes, seeds, JSON output and regression checks"
+    from benchmark import main as benchmark
+    return benchmark(['suite', '--sizes', '8', '11', '--seeds', '0'])
 
 
 if __name__ == "__main__":